@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from itertools import islice, product
+from string import ascii_lowercase
+from typing import Any, Callable, Dict, List, Optional
+
+from words import Dictionary, UsedWords, load_snapshot, process_words, save_snapshot
+
+# Micro-benchmarks of dictionary hot paths on a reproducible synthetic word list
+# Usage: python benchmark.py [--save baseline.json] [--baseline baseline.json]
+
+# Approximate English letter frequencies and word length distribution of the online word list
+LETTER_WEIGHTS = [
+    8.2, 1.5, 2.8, 4.3, 12.7, 2.2, 2.0, 6.1, 7.0, 0.2, 0.8, 4.0, 2.4,
+    6.7, 7.5, 1.9, 0.1, 6.0, 6.3, 9.1, 2.8, 1.0, 2.4, 0.2, 2.0, 0.1,
+]
+LENGTH_WEIGHTS = {
+    1: 1, 2: 5, 3: 20, 4: 50, 5: 90, 6: 130, 7: 150, 8: 150, 9: 130,
+    10: 100, 11: 75, 12: 50, 13: 30, 14: 18, 15: 10, 16: 6, 17: 4, 18: 2, 19: 1, 20: 1,
+}
+PERCENTILES = (50, 90, 99)
+
+
+def generate_words(count: int, seed: int) -> List[str]:
+    # Raw word list resembling the online repo, including entries removed by processing
+    rng = random.Random(seed)
+    lengths = rng.choices(list(LENGTH_WEIGHTS), list(LENGTH_WEIGHTS.values()), k=count)
+    words = ["".join(rng.choices(ascii_lowercase, LETTER_WEIGHTS, k=n)) for n in lengths]
+    for i in rng.sample(range(count), count // 20):
+        words[i] = words[i].capitalize() if i % 2 else words[i] + "-" + str(i)
+    return words
+
+
+class Benchmark:
+    def __init__(self, iterations: int) -> None:
+        self.iterations = iterations
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def run(self, name: str, func: Callable[[], Any], iterations: Optional[int] = None) -> None:
+        func()  # Warm up
+        timings = []
+        for _ in range(iterations or self.iterations):
+            start = time.perf_counter_ns()
+            func()
+            timings.append(time.perf_counter_ns() - start)
+        timings.sort()
+
+        # Peak memory is measured in a separate call since tracing slows down allocations
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = {f"p{p}": timings[min(len(timings) - 1, len(timings) * p // 100)] / 1000 for p in PERCENTILES}
+        result["max"] = timings[-1] / 1000
+        result["peak_kib"] = peak / 1024
+        self.results[name] = result
+
+    def report(self, baseline: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+        columns = [f"p{p}" for p in PERCENTILES] + ["max", "peak_kib"]
+        width = max(len(name) for name in self.results)
+        print(f"{'case':<{width}}  " + "  ".join(f"{c:>16}" for c in columns))
+        for name, result in self.results.items():
+            cells = []
+            for c in columns:
+                cell = f"{result[c]:.1f}"
+                if baseline and name in baseline and baseline[name].get(c):
+                    cell += f" ({result[c] / baseline[name][c]:.2f}x)"
+                cells.append(f"{cell:>16}")
+            print(f"{name:<{width}}  " + "  ".join(cells))
+        print("Latencies in microseconds, peak memory in KiB" + (", ratios against baseline" if baseline else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dictionary hot paths")
+    parser.add_argument("--words", type=int, default=400000, help="size of the synthetic word list")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200, help="iterations of each fast case")
+    parser.add_argument("--save", metavar="PATH", help="record results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare results against a recorded baseline")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    bench = Benchmark(args.iterations)
+    slow_iterations = max(1, args.iterations // 20)
+    raw = generate_words(args.words, args.seed)
+
+    # update_words processing: raw words to snapshot, then dictionary with accepted words merged
+    bench.run("process_words", lambda: process_words(raw), slow_iterations)
+    store = process_words(raw)
+    additions = [w + "s" for w in random.sample(raw, 1000) if w.isalpha() and w.islower()]
+    bench.run("build_dictionary", lambda: Dictionary(store.insert(additions)[0]), slow_iterations)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "words.snapshot")
+        bench.run("save_snapshot", lambda: save_snapshot(path, store), slow_iterations)
+        bench.run("load_snapshot", lambda: load_snapshot(path), slow_iterations)
+
+    tracemalloc.start()
+    dictionary = Dictionary(store.insert(additions)[0])
+    dictionary_kib = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    words = list(dictionary.words_all)
+    new_words = [w + "ed" for w in random.sample(words, 10)]
+    bench.run("add_words", lambda: dictionary.add_words(new_words), slow_iterations)
+
+    # check_word_existence
+    present = random.sample(words, 1000)
+    absent = [w + "q" for w in present if w + "q" not in dictionary]
+    bench.run("check_word_existence/present", lambda: [w in dictionary for w in present])
+    bench.run("check_word_existence/absent", lambda: [w in dictionary for w in absent])
+
+    # filter_words and get_random_word with every combination of constraints
+    used_words = UsedWords(lambda: dictionary)
+    for w in random.sample(words, 300):
+        used_words.add(w)
+    for min_len, starting_letter, banned_letters, required_letter, exclude_words in product(
+        (1, 8), (None, "s"), (None, ["e", "t"]), (None, "z"), (None, used_words)
+    ):
+        params = (min_len, starting_letter, banned_letters, required_letter, exclude_words)
+        label = (
+            f"min_len={min_len},start={starting_letter or '-'},banned={''.join(banned_letters or '-')},"
+            f"required={required_letter or '-'},exclude={len(exclude_words) if exclude_words else '-'}"
+        )
+        bench.run(f"filter_words/{label}", lambda: dictionary.filter_words(*params), slow_iterations)
+        bench.run(f"get_random_word/{label}", lambda: dictionary.random_word(*params))
+
+    # Inline query search path: first page of words starting with prefix
+    for length in range(1, 5):
+        prefixes = [w[:length] for w in random.sample(words, 100) if len(w) >= length]
+        bench.run(
+            f"search_prefix/len={length}",
+            lambda: [list(islice(dictionary.search_prefix(p)[0], 50)) for p in prefixes],
+            max(1, args.iterations // 10),
+        )
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"{len(dictionary.words_all)} words, dictionary uses {dictionary_kib:.0f} KiB")
+    bench.report(baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(bench.results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
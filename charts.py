@@ -0,0 +1,136 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from functools import partial
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")  # Charts are rendered in worker processes without a display
+
+import matplotlib.pyplot as plt
+from matplotlib.dates import DateFormatter
+from matplotlib.ticker import MaxNLocator
+
+# Chart rendering functions are run in a process pool since rendering blocks for a long time
+# Their arguments and results are plain data so that they can be sent between processes
+
+executor: Optional[ProcessPoolExecutor] = None
+
+
+async def render(func: Callable[..., bytes], *args: Any) -> bytes:
+    global executor
+    if not executor:
+        executor = ProcessPoolExecutor(max_workers=1)  # Charts are rare, rendering one at a time is enough
+    try:
+        return await asyncio.get_event_loop().run_in_executor(executor, func, *args)
+    except BrokenProcessPool:  # Worker process died, start a new one next time
+        executor = None
+        raise
+
+
+class ChartCache:
+    # Rendered charts by key, concurrent requests for the same chart share one render
+    # Failed renders are not cached
+
+    def __init__(self) -> None:
+        self.charts: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, render_chart: Callable[[], Awaitable[bytes]]) -> bytes:
+        task = self.charts.get(key)
+        if not task:
+            task = self.charts[key] = asyncio.create_task(render_chart())
+            task.add_done_callback(partial(self.discard_failed, key))
+        # A cancelled caller does not cancel the render for others
+        return await asyncio.shield(task)
+
+    def discard_failed(self, key: Hashable, task: asyncio.Task) -> None:
+        if (task.cancelled() or task.exception()) and self.charts.get(key) is task:
+            del self.charts[key]
+
+    def retain(self, predicate: Callable[[Hashable], bool]) -> None:
+        # Drop charts whose keys do not satisfy predicate
+        for key in [key for key in self.charts if not predicate(key)]:
+            del self.charts[key]
+
+
+def render_trends(
+    days: int,
+    tp: List[date],
+    daily_games: List[int],
+    active_groups: List[int],
+    active_players: List[int],
+    game_mode_play_cnt: List[Tuple[int, str]],
+    cumulative_groups: List[int],
+    cumulative_players: List[int],
+) -> bytes:
+    # Six subplots of the trends in the past days, as JPEG
+    f = DateFormatter("%b %d" if days < 180 else "%b" if days < 335 else "%b %Y")
+    total_games = sum(i[0] for i in game_mode_play_cnt)
+
+    plt.figure(figsize=(15, 8))
+    plt.subplots_adjust(hspace=0.4)
+    plt.suptitle(f"Trends in the Past {days} Days", size=25)
+
+    # Draw the 6 subplots
+
+    sp = plt.subplot(231)
+    sp.xaxis.set_major_formatter(f)
+    sp.yaxis.set_major_locator(MaxNLocator(integer=True))  # Force y-axis intervals to be integral
+    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
+    plt.title("Games Played", size=18)
+    plt.plot(tp, daily_games)
+    plt.ylim(ymin=0)
+
+    sp = plt.subplot(232)
+    sp.xaxis.set_major_formatter(f)
+    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
+    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
+    plt.title("Active Groups", size=18)
+    plt.plot(tp, active_groups)
+    plt.ylim(ymin=0)
+
+    sp = plt.subplot(233)
+    sp.xaxis.set_major_formatter(f)
+    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
+    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
+    plt.title("Active Players", size=18)
+    plt.plot(tp, active_players)
+    plt.ylim(ymin=0)
+
+    plt.subplot(234)
+    labels = [i[1] for i in game_mode_play_cnt]
+    colors = [
+                 "dark maroon", "dark peach", "orange", "leather", "mustard", "teal", "french blue", "booger"
+             ][8 - len(game_mode_play_cnt):]
+    slices, text = plt.pie(
+        [i[0] for i in game_mode_play_cnt],
+        labels=[
+            f"{i[0] / total_games:.1%} ({i[0]})" if i[0] / total_games >= 0.03 else "" for i in game_mode_play_cnt
+        ],
+        colors=["xkcd:" + c for c in colors],
+        startangle=90,
+    )
+    plt.legend(slices, labels, title="Game Modes Played", fontsize="x-small", loc="best")
+    plt.axis("equal")
+
+    sp = plt.subplot(235)
+    sp.xaxis.set_major_formatter(f)
+    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
+    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
+    plt.title("Cumulative Groups", size=18)
+    plt.plot(tp, cumulative_groups)
+
+    sp = plt.subplot(236)
+    sp.xaxis.set_major_formatter(f)
+    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
+    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
+    plt.title("Cumulative Players", size=18)
+    plt.plot(tp, cumulative_players)
+
+    buffer = BytesIO()
+    plt.savefig(buffer, format="jpg", bbox_inches="tight")
+    plt.close("all")
+    return buffer.getvalue()
@@ -2,14 +2,18 @@ import asyncio
 import json
 import logging
 import os
-from string import ascii_lowercase
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Optional, Iterable
 
 import aiohttp
 import asyncpg
 from aiogram import Bot, Dispatcher, types
+from aiogram.bot.api import TELEGRAM_PRODUCTION, TelegramAPIServer
 from aiogram.dispatcher.filters import BoundFilter
 
+from scheduler import TimerWheel
+from sender import Sender
+from words import Dictionary, WordIndex, WordList, WordStore, load_snapshot, process_words, save_snapshot
+
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -36,55 +40,118 @@ OFFICIAL_GROUP_ID = config["OFFICIAL_GROUP_ID"]
 WORD_ADDITION_CHANNEL_ID = config["WORD_ADDITION_CHANNEL_ID"]
 VIP = config["VIP"]
 VIP_GROUP = config["VIP_GROUP"]
+# Optional, updates are received by long polling unless a webhook URL is set
+WEBHOOK_URL: Optional[str] = config.get("WEBHOOK_URL")
+WEBHOOK_HOST: str = config.get("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT: int = config.get("WEBHOOK_PORT", 8443)
+UPDATE_WORKERS: int = config.get("UPDATE_WORKERS", 32)
+BOT_API_URL: Optional[str] = config.get("BOT_API_URL")  # Alternative Bot API server, e.g. local_api.py
 
 loop = asyncio.get_event_loop()
 BOT_ID = int(TOKEN.partition(":")[0])
 ON9BOT_ID = int(ON9BOT_TOKEN.partition(":")[0])
-bot = Bot(TOKEN, loop, parse_mode=types.ParseMode.MARKDOWN)
-on9bot = Bot(ON9BOT_TOKEN, loop)
+api_server = TelegramAPIServer.from_base(BOT_API_URL) if BOT_API_URL else TELEGRAM_PRODUCTION
+bot = Bot(TOKEN, loop, parse_mode=types.ParseMode.MARKDOWN, server=api_server)
+on9bot = Bot(ON9BOT_TOKEN, loop, server=api_server)
 dp = Dispatcher(bot)
+sender = Sender(loop, bot)  # Rate limits bot messages, used for everything sent to groups in bulk
 
 GAMES: Dict[int, "ClassicGame"] = {}  # Group id mapped to game instance
+timer_wheel = TimerWheel(loop)  # Drives joining phase and turn timers of every game
 pool: Optional[asyncpg.pool.Pool] = None
 session: Optional[aiohttp.ClientSession] = None
-WORDS_ALL: List[str] = []  # List of all words
-WORDS_LI: Dict[str, List[str]] = {}  # Letter mapped to list of words starting with letter
-WORDS: Dict[str, Set[str]] = {}  # Letter mapped to set of words starting with letter
+WORDS_SNAPSHOT_PATH = "words.snapshot"  # Processed words from online repo
+DICTIONARY: Optional[Dictionary] = None  # Replaced as a whole whenever words are changed
+words_update_lock = asyncio.Lock()
+
+
+def get_dictionary() -> Dictionary:
+    return DICTIONARY
+
+
+def get_words_all() -> WordList:
+    return DICTIONARY.words_all
 
 
-def get_words_all() -> List[str]:
-    return WORDS_ALL
+def get_words_set() -> Dict[str, WordList]:
+    return DICTIONARY.words_set
 
 
-def get_words_set() -> Dict[str, Set[str]]:
-    return WORDS
+def get_words_li() -> Dict[str, WordList]:
+    return DICTIONARY.words_li
 
 
-def get_words_li() -> Dict[str, List[str]]:
-    return WORDS_LI
+def get_word_index() -> WordIndex:
+    return DICTIONARY.index
 
 
-async def update_words() -> None:
-    global WORDS_ALL, WORDS_LI, WORDS
+def get_words_version() -> int:
+    return DICTIONARY.version
 
-    # Retrieve words from online repo and table of added words in db
+
+async def fetch_upstream_words() -> Optional[WordStore]:
+    # Retrieve and process words from online repo, then save them as the local snapshot
+    # Return None if the online repo is unreachable
     logger.info("Retrieving words")
-    async with session.get("https://raw.githubusercontent.com/dwyl/english-words/master/words.txt") as resp:
-        wordlist = (await resp.text()).splitlines()
-    async with pool.acquire() as conn:
-        res = await conn.fetch("SELECT word from wordlist WHERE accepted;")
-        wordlist += [row[0] for row in res]
+    try:
+        async with session.get(
+            "https://raw.githubusercontent.com/dwyl/english-words/master/words.txt", raise_for_status=True
+        ) as resp:
+            wordlist = (await resp.text()).splitlines()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Failed to retrieve words: {e.__class__.__name__}: {e}")
+        return None
+
+    # Process words outside of the event loop so that running games are not blocked
+    return await loop.run_in_executor(None, process_upstream_words, wordlist)
 
-    # Remove non-alphabetical words and make every word lowercase
+
+def process_upstream_words(wordlist: List[str]) -> WordStore:
     logger.info("Processing words")
-    wordlist = [w.lower() for w in wordlist if w.isalpha()]
-    # Sort and remove duplicates
-    WORDS_ALL = sorted(set(wordlist))
+    store = process_words(wordlist)
+
+    save_snapshot(WORDS_SNAPSHOT_PATH, store)
+    return store
 
-    WORDS_LI = {i: [] for i in ascii_lowercase}
-    for w in WORDS_ALL:
-        WORDS_LI[w[0]].append(w)
-    WORDS = {i: set(WORDS_LI[i]) for i in ascii_lowercase}
+
+async def update_words(refresh: bool = False) -> bool:
+    # refresh: Retrieve words from online repo instead of local snapshot
+    # Return False if words were taken from the other source instead
+    global DICTIONARY
+
+    async with words_update_lock:
+        if refresh:
+            store = await fetch_upstream_words()
+        else:
+            store = await loop.run_in_executor(None, load_snapshot, WORDS_SNAPSHOT_PATH)
+        fallback = store is None
+        if fallback:  # Fall back to the other source (e.g. snapshot missing or online repo unreachable)
+            if refresh:
+                store = await loop.run_in_executor(None, load_snapshot, WORDS_SNAPSHOT_PATH)
+            else:
+                store = await fetch_upstream_words()
+        if store is None:
+            raise RuntimeError("Words unavailable from both online repo and snapshot")
+
+        # Merge table of added words in db
+        async with pool.acquire() as conn:
+            res = await conn.fetch("SELECT word from wordlist WHERE accepted;")
+        additions = [row[0].lower() for row in res if row[0].isalpha()]
+
+        # Build new dictionary outside of the event loop and swap it in when complete
+        version = DICTIONARY.version + 1 if DICTIONARY else 1
+        DICTIONARY = await loop.run_in_executor(
+            None, lambda: Dictionary(store.insert(additions)[0], version=version)
+        )
+        return not fallback
+
+
+async def add_words(words: Iterable[str]) -> None:
+    # Insert words instead of rebuilding everything with update_words
+    global DICTIONARY
+
+    async with words_update_lock:
+        DICTIONARY = await loop.run_in_executor(None, DICTIONARY.add_words, words)
 
 
 async def init() -> None:
@@ -106,10 +173,32 @@ class GameState:
     KILLGAME = -1
 
 
+class GameEvent:
+    # Events processed one at a time from a game's inbox
+    TICK = "tick"  # Timer due or turn answered, ignored if a later tick was posted or scheduled since
+    JOIN = "join"
+    FORCEJOIN = "forcejoin"
+    FLEE = "flee"
+    FORCEFLEE = "forceflee"
+    EXTEND = "extend"
+    FORCESTART = "forcestart"
+    ADDVP = "addvp"
+    REMVP = "remvp"
+    REMIND = "remind"
+    ROSTER = "roster"  # Edit joining phase roster message
+    ANSWER = "answer"
+    VP_ANSWER = "vp_answer"
+    FORCESKIP = "forceskip"
+    TURN_SENT = "turn_sent"  # Turn prompt sent, turn timer starts
+    SEND_FAILED = "send_failed"  # Game message could not be sent
+    KILL = "kill"
+
+
 class GameSettings:
     INITIAL_JOINING_PHASE_SECONDS = 60
     SPECIAL_GAME_INITIAL_JOINING_PHASE_SECONDS = 90
     MAX_JOINING_PHASE_SECONDS = 180
+    ROSTER_EDIT_SECONDS = 5  # Minimum interval between edits of the joining phase roster message
     NORMAL_GAME_MIN_PLAYERS = 2
     SPECIAL_GAME_MIN_PLAYERS = 5
     MAX_PLAYERS = 50
@@ -1,16 +1,28 @@
 import asyncio
+import logging
+import math
 import random
+from bisect import bisect_left
+from collections import deque
 from datetime import datetime
 from string import ascii_lowercase
-from typing import Any, Optional
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple, ValuesView
 
 from aiocache import cached
 from aiogram import types
-from aiogram.utils.exceptions import BadRequest
+from aiogram.utils.exceptions import BadRequest, MessageNotModified, MigrateToChat
 from aiogram.utils.markdown import quote_html
 
-from constants import GAMES, STAR, GameSettings, GameState, bot, on9bot, pool, OWNER_ID
-from utils import get_random_word, send_admin_group, check_word_existence, has_star
+from constants import (
+    GAMES, STAR, GameEvent, GameSettings, GameState, bot, on9bot, OWNER_ID, get_dictionary, loop, sender, timer_wheel
+)
+from utils import get_random_word, check_word_existence, has_star, migrate_group
+from results import GameResult, result_writer
+from scheduler import Timer
+from sender import Priority
+from words import UsedWords, check_letters
+
+logger = logging.getLogger(__name__)
 
 
 class Player:
@@ -50,19 +62,196 @@ class Player:
         self.mention = user.get_mention(name=f"{user.full_name} {STAR}", as_html=True)
 
 
+class Roster:
+    # Players indexed by user id, with turn order kept in a deque so that turns rotate in O(1)
+
+    def __init__(self) -> None:
+        self.players: Dict[int, Player] = {}  # User id mapped to player, in joining order
+        self.in_game: Deque[Player] = deque()  # Players in game in turn order, current player first
+        self.in_game_ids: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.players
+
+    def get(self, user_id: int) -> Optional[Player]:
+        return self.players.get(user_id)
+
+    def add(self, player: Player, in_game: bool = False) -> None:
+        self.players[player.user_id] = player
+        if in_game:
+            self.in_game.append(player)
+            self.in_game_ids.add(player.user_id)
+
+    def remove(self, user_id: int) -> Optional[Player]:
+        # Only used in joining phase, before turn order is set
+        return self.players.pop(user_id, None)
+
+    def start(self) -> None:
+        # Set random turn order
+        players = list(self.players.values())
+        random.shuffle(players)
+        self.players = {p.user_id: p for p in players}
+        self.in_game.clear()
+        self.in_game.extend(players)
+        self.in_game_ids = set(self.players)
+
+    def is_in_game(self, player: Player) -> bool:
+        return player.user_id in self.in_game_ids
+
+    def rotate(self) -> None:
+        # Move current player to the end of queue
+        self.in_game.rotate(-1)
+
+    def move_to_front(self, i: int) -> None:
+        # Swap player at index i with current player
+        self.in_game[0], self.in_game[i] = self.in_game[i], self.in_game[0]
+
+    def eliminate_current(self) -> None:
+        self.in_game_ids.discard(self.in_game.popleft().user_id)
+
+    def eliminate(self, players: Iterable[Player]) -> None:
+        self.in_game_ids.difference_update(p.user_id for p in players)
+        remaining = [p for p in self.in_game if p.user_id in self.in_game_ids]
+        self.in_game.clear()
+        self.in_game.extend(remaining)
+
+
+class Leaderboard:
+    # Players in game ranked by score descending then user id ascending
+    # The user id part is to ensure consistent ordering of players with same score
+    # A player's position is updated when their score changes instead of sorting every player again,
+    # and rendered lines are cached until their rank changes
+
+    def __init__(self, players: Iterable[Player]) -> None:
+        self.players: Dict[int, Player] = {p.user_id: p for p in players}
+        self.scores: Dict[int, int] = {p.user_id: p.score for p in self.players.values()}  # Scores as ranked
+        self.keys: List[Tuple[int, int]] = sorted((-p.score, p.user_id) for p in self.players.values())
+        self.lines: List[Optional[str]] = [None] * len(self.keys)  # Rendered line of each rank
+        self.text: Optional[str] = None  # Rendered full leaderboard
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, i: int) -> Player:
+        return self.players[self.keys[i][1]]
+
+    def index(self, player: Player) -> int:
+        return bisect_left(self.keys, (-self.scores[player.user_id], player.user_id))
+
+    def update(self, player: Player) -> None:
+        # Move player to their new rank after their score changed
+        old = self.index(player)
+        del self.keys[old]
+        self.scores[player.user_id] = player.score
+        new = bisect_left(self.keys, (-player.score, player.user_id))
+        self.keys.insert(new, (-player.score, player.user_id))
+        # Only ranks between the old and new positions are shifted
+        for i in range(min(old, new), max(old, new) + 1):
+            self.lines[i] = None
+        self.text = None
+
+    def remove(self, players: Iterable[Player]) -> None:
+        for p in players:
+            del self.keys[self.index(p)]
+            del self.players[p.user_id]
+            del self.scores[p.user_id]
+        self.lines = [None] * len(self.keys)
+        self.text = None
+
+    def line(self, i: int, highlight: bool = False) -> str:
+        if self.lines[i] is None:
+            p = self[i]
+            self.lines[i] = f"{i + 1}. {p.name}: {p.score}\n"
+        return "> " + self.lines[i] if highlight else self.lines[i]
+
+    def render(self, show_player: Optional[Player] = None) -> str:
+        if not show_player:
+            # Show every player
+            if self.text is None:
+                self.text = "".join(self.line(i) for i in range(len(self))).rstrip()
+            return self.text
+
+        # Highlight player (while showing 10 other players at max)
+        n = len(self)
+        idx = self.index(show_player)
+        if n <= 10:
+            # Show every player
+            text = "".join(self.line(i, i == idx) for i in range(n))
+        elif idx <= 4 or idx >= n - 5:
+            # Player is in first or last 5 places, show those places
+            text = "".join(self.line(i, i == idx) for i in range(5))
+            text += "...\n"
+            text += "".join(self.line(i, i == idx) for i in range(n - 5, n))
+        else:
+            # Player not in first or last 5 places, show player in middle
+            text = "".join(self.line(i) for i in range(5))
+            # Prevent awkward ellipses if player is 6th place from top or bottom
+            if idx != 5:
+                text += "...\n"
+            text += self.line(idx, True)
+            if idx != n - 6:
+                text += "...\n"
+            text += "".join(self.line(i) for i in range(n - 5, n))
+        return text.rstrip()
+
+
 class ClassicGame:
     name = "classic game"
 
     def __init__(self, group_id: int) -> None:
         self.group_id = group_id
-        self.players = []
-        self.players_in_game = []
+        self.roster = Roster()
         self.state = GameState.JOINING
         self.start_time = None
         self.end_time = None
+        # Metrics shown in /runinfo and /playinggroups
+        self.created_time = datetime.now().replace(microsecond=0)
+        self.ticks = 0
+        self.last_activity = loop.time()
         # Store user ids rather than Player object since players may quit then join to extend again
         self.extended_user_ids = set()
 
+        # Events are handled one at a time by the main loop, so handlers never run concurrently
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.event_handlers = {
+            GameEvent.JOIN: self.join,
+            GameEvent.FORCEJOIN: self.forcejoin,
+            GameEvent.FLEE: self.flee,
+            GameEvent.FORCEFLEE: self.forceflee,
+            GameEvent.EXTEND: self.extend,
+            GameEvent.FORCESTART: self.forcestart,
+            GameEvent.ADDVP: self.addvp,
+            GameEvent.REMVP: self.remvp,
+            GameEvent.REMIND: self.remind,
+            GameEvent.ROSTER: self.send_roster,
+            GameEvent.ANSWER: self.answer,
+            GameEvent.VP_ANSWER: self.vp_answer,
+            GameEvent.FORCESKIP: self.forceskip,
+            GameEvent.TURN_SENT: self.start_turn,
+            GameEvent.SEND_FAILED: self.send_failed,
+        }
+
+        # Timers are run by the shared timer wheel, which posts events to the inbox when they are due
+        self.deadline: Optional[float] = None  # Event loop time at which the joining phase or current turn ends
+        self.tick_id = 0  # Id of the latest tick posted or scheduled, earlier ticks still queued are stale
+        self.timer: Optional[Timer] = None  # Fires at deadline
+        self.timers: List[Timer] = []  # Join reminders and VP answers, cancelled along with the deadline
+
+        # Messages are queued and merged into as few messages as possible when the game becomes idle
+        self.outbox: Deque[Tuple[str, str, int]] = deque()  # Text, parse mode and sender priority
+        # Messages are handed to the sender without waiting for them to be sent, failures are posted to the inbox
+        # Sender futures of messages not sent yet mapped to text, parse mode, priority and other options
+        self.sending: Dict[asyncio.Future, Tuple[str, str, int, Dict[str, Any]]] = {}
+        self.turn_prompt: Optional[asyncio.Future] = None  # Sender future of the current turn's prompt
+        # Joining and fleeing during joining phase are shown in one roster message which is edited periodically
+        self.roster_message: Optional[types.Message] = None
+        self.roster_changed = False
+        self.roster_timer: Optional[Timer] = None
+        self.roster_edit_time = 0.0
+
         # Game settings
         self.min_players = GameSettings.NORMAL_GAME_MIN_PLAYERS
         self.max_players = GameSettings.MAX_PLAYERS
@@ -77,16 +266,184 @@ class ClassicGame:
         self.answered = False
         self.accepting_answers = False
         self.turns = 0
-        self.used_words = set()
+        self.used_words = UsedWords(get_dictionary)
+
+    @property
+    def time_left(self) -> int:
+        # Seconds until the joining phase ends or the current turn times out
+        if self.timer and self.timer.pending:
+            return max(0, math.ceil(self.deadline - loop.time()))
+        return 0
+
+    @time_left.setter
+    def time_left(self, seconds: int) -> None:
+        self.set_deadline(loop.time() + seconds)
+
+    def set_deadline(self, deadline: float) -> None:
+        self.cancel_timers()
+        self.deadline = deadline
+        seconds = deadline - loop.time()
+        if seconds <= 0:
+            self.post_tick()
+            return
+
+        self.timer = timer_wheel.call_at(deadline, self.post, GameEvent.TICK, self.next_tick_id())
+        if self.state == GameState.JOINING:
+            for n in (15, 30, 60):
+                if seconds - n >= 1:
+                    self.timers.append(timer_wheel.call_at(deadline - n, self.post, GameEvent.REMIND, n))
+
+    def cancel_all_timers(self) -> None:
+        self.cancel_timers()
+        if self.roster_timer:
+            self.roster_timer.cancel()
+
+    def cancel_timers(self) -> None:
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        for timer in self.timers:
+            timer.cancel()
+        self.timers.clear()
+
+    def next_tick_id(self) -> int:
+        # A new tick supersedes every tick posted or scheduled before it
+        # e.g. a deadline tick queued just before an answer, or a second /forcestart,
+        # must not end a later turn whose prompt may not even have been sent yet
+        self.tick_id += 1
+        return self.tick_id
+
+    def post_tick(self) -> None:
+        self.post(GameEvent.TICK, self.next_tick_id())
+
+    def post(self, event: str, *args: Any) -> None:
+        # Queue event to be handled by the main loop, callers return without waiting for it to be handled
+        self.inbox.put_nowait((event, args))
+
+    @property
+    def players(self) -> ValuesView[Player]:
+        return self.roster.players.values()
+
+    @property
+    def players_in_game(self) -> Deque[Player]:
+        return self.roster.in_game
 
     def user_in_game(self, user_id: int) -> bool:
-        for p in self.players:
-            if p.user_id == user_id:
-                return True
-        return False
+        return user_id in self.roster
+
+    async def send_message(
+        self, text: str, parse_mode: str = types.ParseMode.HTML, priority: int = Priority.GAME, **kwargs: Any
+    ) -> None:
+        if kwargs:  # Messages with other options (e.g. reply markup) cannot be merged
+            self.flush()
+            self.send(text, parse_mode, priority, kwargs)
+        else:
+            self.outbox.append((text, parse_mode, priority))
+
+    async def reply(self, message: types.Message, text: str) -> None:
+        # Replies in bot's default parse mode (Markdown)
+        # A reply failing (e.g. answer deleted) only affects that reply, so it is not waited for at all
+        sender.enqueue(self.group_id, Priority.GAME, message.reply, text).add_done_callback(self.on_reply_sent)
 
-    async def send_message(self, *args: Any, **kwargs: Any) -> types.Message:
-        return await bot.send_message(self.group_id, *args, disable_web_page_preview=True, **kwargs)
+    def on_reply_sent(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Failed to reply in group {self.group_id}: {future.exception()!r}")
+
+    def send(self, text: str, parse_mode: str, priority: int, kwargs: Dict[str, Any]) -> asyncio.Future:
+        future = sender.enqueue_message(
+            self.group_id, text, priority, parse_mode=parse_mode, disable_web_page_preview=True, **kwargs
+        )
+        self.sending[future] = (text, parse_mode, priority, kwargs)
+        future.add_done_callback(self.on_sent)
+        return future
+
+    def on_sent(self, future: asyncio.Future) -> None:
+        text, parse_mode, priority, kwargs = self.sending.pop(future)
+        if future.cancelled():
+            return
+        if future.exception():
+            # Handled by the main loop
+            self.post(GameEvent.SEND_FAILED, future.exception(), text, parse_mode, priority, kwargs)
+        elif future is self.turn_prompt:
+            self.post(GameEvent.TURN_SENT, future)
+
+    async def send_failed(
+        self, error: Exception, text: str, parse_mode: str, priority: int, kwargs: Dict[str, Any]
+    ) -> None:
+        if not isinstance(error, MigrateToChat):
+            raise error
+        # Group upgraded to a supergroup, move the game there unless done already and send the message again
+        # Other messages sent to the old group before the game moved end up here too
+        if error.migrate_to_chat_id != self.group_id:
+            await migrate_group(self.group_id, error.migrate_to_chat_id)
+        await self.send_message(text, parse_mode, priority, **kwargs)
+
+    async def wait_sent(self) -> None:
+        # Wait for messages handed to the sender, raising the first error
+        if self.sending:
+            await asyncio.gather(*self.sending)
+
+    def flush(self) -> None:
+        # Hand queued messages to the sender, merging consecutive messages with the same parse mode
+        # Merged messages are sent with the highest priority among them so turn prompts are never held back
+        # Messages of a game are sent in order as long as their priorities do not differ
+        while self.outbox:
+            text, parse_mode, priority = self.outbox[0]
+            merged = 1
+            while (
+                merged < len(self.outbox)
+                and self.outbox[merged][1] == parse_mode
+                and len(text) + len(self.outbox[merged][0]) + 2 <= 4096  # Message length limit
+            ):
+                text += "\n\n" + self.outbox[merged][0]
+                priority = min(priority, self.outbox[merged][2])
+                merged += 1
+            future = self.send(text, parse_mode, priority, {})
+            if priority == Priority.TURN:
+                self.turn_prompt = future
+            for _ in range(merged):
+                self.outbox.popleft()
+
+    def update_roster(self) -> None:
+        # The first roster message is sent right away, later changes are edited in at most every few seconds
+        self.roster_changed = True
+        if not (self.roster_timer and self.roster_timer.pending):
+            self.roster_timer = timer_wheel.call_at(
+                max(loop.time(), self.roster_edit_time + GameSettings.ROSTER_EDIT_SECONDS), self.post, GameEvent.ROSTER
+            )
+
+    async def send_roster(self) -> None:
+        if not self.roster_changed:
+            return
+        self.roster_changed = False
+        self.roster_edit_time = loop.time()
+
+        # Show at most 50 names to stay within message length limit
+        text = f"Players ({len(self.players)}/{self.max_players}):\n" + "\n".join(
+            p.name for p, _ in zip(self.players, range(50))
+        )
+        if len(self.players) > 50:
+            text += f"\nand {len(self.players) - 50} more"
+
+        if self.roster_message:
+            try:
+                await sender.submit(
+                    self.group_id,
+                    Priority.ANNOUNCEMENT,
+                    self.roster_message.edit_text,
+                    text,
+                    parse_mode=types.ParseMode.HTML,
+                    disable_web_page_preview=True,
+                )
+                return
+            except MessageNotModified:
+                return
+            except BadRequest:  # Roster message deleted, send a new one
+                pass
+        self.flush()
+        self.roster_message = await sender.send_message(
+            self.group_id, text, Priority.ANNOUNCEMENT, parse_mode=types.ParseMode.HTML, disable_web_page_preview=True
+        )
 
     @cached(ttl=15)
     async def is_admin(self, user_id: int) -> bool:
@@ -97,25 +454,15 @@ class ClassicGame:
         if self.state != GameState.JOINING or len(self.players) >= self.max_players:
             return
 
-        # Try to detect game not starting
-        if self.time_left < 0:
-            await self.scan_for_stale_timer()
-            return
-
         # Check if user already joined
         user = message.from_user
         if self.user_in_game(user.id):
             return
 
         player = Player(user)
-        self.players.append(player)
+        self.roster.add(player)
         await player.update_donor_status(user)
-
-        await self.send_message(
-            f"{player.name} joined. There {'is' if len(self.players) == 1 else 'are'} "
-            f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}.",
-            parse_mode=types.ParseMode.HTML,
-        )
+        self.update_roster()
 
         # Start game when max players reached
         if len(self.players) >= self.max_players:
@@ -138,17 +485,18 @@ class ClassicGame:
             player = Player(vp=True)
         else:
             player = Player(user)
-        self.players.append(player)
-        if self.state == GameState.RUNNING:
-            self.players_in_game.append(player)
+        self.roster.add(player, in_game=self.state == GameState.RUNNING)
         if user.id != on9bot.id:
             await player.update_donor_status(user)
 
-        await self.send_message(
-            f"{player.name} has been joined. There {'is' if len(self.players) == 1 else 'are'} "
-            f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}.",
-            parse_mode=types.ParseMode.HTML,
-        )
+        if self.state == GameState.JOINING:
+            self.update_roster()
+        else:
+            await self.send_message(
+                f"{player.name} has been joined. There {'is' if len(self.players) == 1 else 'are'} "
+                f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}.",
+                parse_mode=types.ParseMode.HTML,
+            )
 
         # Start game when max players reached
         if len(self.players) >= self.max_players:
@@ -158,40 +506,16 @@ class ClassicGame:
         if self.state != GameState.JOINING:
             return
 
-        # Find player to remove
-        user_id = message.from_user.id
-        for i in range(len(self.players)):
-            if self.players[i].user_id == user_id:
-                player = self.players.pop(i)
-                break
-        else:
-            return
-
-        await self.send_message(
-            f"{player.name} fled. There {'is' if len(self.players) == 1 else 'are'} "
-            f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}.",
-            parse_mode=types.ParseMode.HTML,
-        )
+        if self.roster.remove(message.from_user.id):
+            self.update_roster()
 
     async def forceflee(self, message: types.Message) -> None:
         # Player to be fled = Sender of replies message
         if self.state != GameState.JOINING or not message.reply_to_message:
             return
 
-        # Find player to remove
-        user_id = message.reply_to_message.from_user.id
-        for i in range(len(self.players)):
-            if self.players[i].user_id == user_id:
-                player = self.players.pop(i)
-                break
-        else:
-            return
-
-        await self.send_message(
-            f"{player.name} has been fled. There {'is' if len(self.players) == 1 else 'are'} "
-            f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}.",
-            parse_mode=types.ParseMode.HTML,
-        )
+        if self.roster.remove(message.reply_to_message.from_user.id):
+            self.update_roster()
 
     async def extend(self, message: types.Message) -> None:
         if self.state != GameState.JOINING:
@@ -236,7 +560,7 @@ class ClassicGame:
                 # Start game immediately
                 self.time_left = -99999
             else:
-                self.time_left -= n
+                self.set_deadline(self.deadline - n)
                 await self.send_message(
                     f"The joining phase has been reduced by {n}s.\n"
                     f"You have {self.time_left}s to /join."
@@ -245,20 +569,27 @@ class ClassicGame:
             # Extend joining phase time
             # Max joining phase duration is capped
             added_duration = min(n, GameSettings.MAX_JOINING_PHASE_SECONDS - self.time_left)
-            self.time_left += added_duration
+            self.set_deadline(self.deadline + added_duration)
             await self.send_message(
                 f"The joining phase has been extended by {added_duration}s.\n"
                 f"You have {self.time_left}s to /join."
             )
 
+    async def forcestart(self) -> None:
+        if self.state == GameState.JOINING:
+            self.time_left = -99999
+
+    async def remind(self, seconds: int) -> None:
+        if self.state == GameState.JOINING:
+            await self.send_message(f"{seconds}s left to /join.", priority=Priority.ANNOUNCEMENT)
+
     async def addvp(self, message: types.Message) -> None:
         if self.state != GameState.JOINING or len(self.players) >= self.max_players:
             return
 
         # Check if On9Bot already joined
-        for p in self.players:
-            if p.is_vp:
-                return
+        if on9bot.id in self.roster:
+            return
 
         # Check if vp adder is player/admin/owner
         if (
@@ -275,7 +606,7 @@ class ClassicGame:
             assert vp.is_chat_member() or vp.is_chat_admin()
         except (BadRequest, AssertionError):
             await self.send_message(
-                f"Add [On9Bot](tg://user?id={on9bot.id}) here to play as a virtual player.",
+                f"Add <a href='tg://user?id={on9bot.id}'>On9Bot</a> here to play as a virtual player.",
                 reply_markup=types.InlineKeyboardMarkup(
                     inline_keyboard=[
                         [
@@ -290,16 +621,10 @@ class ClassicGame:
             return
 
         vp = Player(vp=True)
-        self.players.append(vp)
+        self.roster.add(vp)
 
         await on9bot.send_message(self.group_id, "/join@" + (await bot.me).username)
-        await self.send_message(
-            (
-                f"{vp.name} joined. There {'is' if len(self.players) == 1 else 'are'} "
-                f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}."
-            ),
-            parse_mode=types.ParseMode.HTML,
-        )
+        self.update_roster()
 
         # Start game when max players reached
         if len(self.players) >= self.max_players:
@@ -310,11 +635,8 @@ class ClassicGame:
             return
 
         # Check if On9Bot has joined
-        for i in range(len(self.players)):
-            if self.players[i].is_vp:
-                vp = self.players.pop(i)
-                break
-        else:
+        vp = self.roster.remove(on9bot.id)
+        if not vp:
             return
 
         # Check if vp remover is player/admin
@@ -327,13 +649,7 @@ class ClassicGame:
             return
 
         await on9bot.send_message(self.group_id, "/flee@" + (await bot.me).username)
-        await self.send_message(
-            (
-                f"{vp.name} fled. There {'is' if len(self.players) == 1 else 'are'} "
-                f"{len(self.players)} player{'' if len(self.players) == 1 else 's'}."
-            ),
-            parse_mode=types.ParseMode.HTML,
-        )
+        self.update_roster()
 
     async def send_turn_message(self) -> None:
         await self.send_message(
@@ -346,15 +662,23 @@ class ClassicGame:
                 f"Total words: {self.turns}"
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
+
+    async def start_turn(self, prompt: asyncio.Future) -> None:
+        # Start the turn timer once the turn prompt has been sent, after any flood wait it went through
+        if prompt is not self.turn_prompt or self.answered or not self.accepting_answers:
+            return  # Turn ended already, e.g. force skipped
+        self.turn_prompt = None
         self.time_left = self.time_limit
 
         if self.players_in_game[0].is_vp:
-            await self.vp_answer()
+            self.schedule_vp_answer()
 
     def get_random_valid_answer(self) -> Optional[str]:
         return get_random_word(
@@ -363,11 +687,13 @@ class ClassicGame:
             exclude_words=self.used_words,
         )
 
-    async def vp_answer(self) -> None:
+    def schedule_vp_answer(self) -> None:
         # Wait before answering to prevent exceeding 20 msg/min message limit
         # Also simulate thinking/input time like human players, wowzers
-        await asyncio.sleep(random.uniform(2, 5))
+        # Timer is cancelled if the turn ends before VP answers
+        self.timers.append(timer_wheel.call_later(random.uniform(2, 5), self.post, GameEvent.VP_ANSWER))
 
+    async def vp_answer(self) -> None:
         word = self.get_random_valid_answer()
 
         if not word:  # No valid words to choose from
@@ -385,22 +711,37 @@ class ClassicGame:
         # True/False: valid/invalid answer
         return True
 
+    async def answer(self, message: types.Message) -> None:
+        # Game may have changed since the answer was queued
+        if (
+            self.state == GameState.RUNNING
+            and self.players_in_game
+            and message.from_user.id == self.players_in_game[0].user_id
+            and not self.answered
+            and self.accepting_answers
+        ):
+            await self.handle_answer(message)
+
+    async def forceskip(self) -> None:
+        if self.state == GameState.RUNNING and not self.answered:
+            self.time_left = 0
+
     async def handle_answer(self, message: types.Message) -> None:
         word = message.text.lower()
 
         # Check if answer is invalid
         if not word.startswith(self.current_word[-1]):
-            await message.reply(f"_{word.capitalize()}_ does not start with _{self.current_word[-1].upper()}_.")
+            await self.reply(message, f"_{word.capitalize()}_ does not start with _{self.current_word[-1].upper()}_.")
             return
         if not isinstance(self, EliminationGame):  # No minimum letters limit for elimination game modes
             if len(word) < self.min_letters_limit:
-                await message.reply(f"_{word.capitalize()}_ has less than {self.min_letters_limit} letters.")
+                await self.reply(message, f"_{word.capitalize()}_ has less than {self.min_letters_limit} letters.")
                 return
         if word in self.used_words:
-            await message.reply(f"_{word.capitalize()}_ has been used.")
+            await self.reply(message, f"_{word.capitalize()}_ has been used.")
             return
         if not check_word_existence(word):
-            await message.reply(f"_{word.capitalize()}_ is not in my list of words.")
+            await self.reply(message, f"_{word.capitalize()}_ is not in my list of words.")
             return
         if not await self.additional_answer_checkers(word, message):
             return
@@ -432,23 +773,27 @@ class ClassicGame:
         self.answered = True
         self.accepting_answers = False
 
+        # Move on to the next turn immediately
+        self.cancel_timers()
+        self.post_tick()
+
     async def send_post_turn_message(self, word: str) -> None:
-        text = f"_{word.capitalize()}_ is accepted.\n\n"
+        text = f"<i>{word.capitalize()}</i> is accepted.\n\n"
         # Reduce limits if possible every set number of turns
         if self.turns % GameSettings.TURNS_BETWEEN_LIMITS_CHANGE == 0:
             if self.time_limit > GameSettings.MIN_TURN_SECONDS:
                 self.time_limit -= GameSettings.TURN_SECONDS_REDUCTION_PER_LIMIT_CHANGE
                 text += (
                     f"Time limit decreased from "
-                    f"*{self.time_limit + GameSettings.TURN_SECONDS_REDUCTION_PER_LIMIT_CHANGE}s* "
-                    f"to *{self.time_limit}s*.\n"
+                    f"<b>{self.time_limit + GameSettings.TURN_SECONDS_REDUCTION_PER_LIMIT_CHANGE}s</b> "
+                    f"to <b>{self.time_limit}s</b>.\n"
                 )
             if self.min_letters_limit < GameSettings.MAX_WORD_LENGTH_LIMIT:
                 self.min_letters_limit += GameSettings.WORD_LENGTH_LIMIT_INCREASE_PER_LIMIT_CHANGE
                 text += (
                     f"Minimum letters per word increased from "
-                    f"*{self.min_letters_limit - GameSettings.WORD_LENGTH_LIMIT_INCREASE_PER_LIMIT_CHANGE}* "
-                    f"to *{self.min_letters_limit}*.\n"
+                    f"<b>{self.min_letters_limit - GameSettings.WORD_LENGTH_LIMIT_INCREASE_PER_LIMIT_CHANGE}</b> "
+                    f"to <b>{self.min_letters_limit}</b>.\n"
                 )
         await self.send_message(text.rstrip())
 
@@ -470,9 +815,8 @@ class ClassicGame:
         # False: Game is still ongoing
         if self.answered:
             # Move player who just answered to the end of queue
-            self.players_in_game.append(self.players_in_game.pop(0))
+            self.roster.rotate()
         else:
-            self.time_left -= 1
             if self.time_left > 0:
                 return False
 
@@ -482,7 +826,7 @@ class ClassicGame:
                 f"{self.players_in_game[0].mention} ran out of time! They have been eliminated.",
                 parse_mode=types.ParseMode.HTML,
             )
-            del self.players_in_game[0]
+            self.roster.eliminate_current()
 
             if len(self.players_in_game) == 1:
                 await self.handle_game_end()
@@ -501,104 +845,67 @@ class ClassicGame:
         text = f"{winner} won the game out of {len(self.players)} players!\n"
         text += f"Total words: {self.turns}\n"
         if self.longest_word:
-            longest_word_sender_name = [p for p in self.players if p.user_id == self.longest_word_sender_id][0].name
+            longest_word_sender_name = self.roster.get(self.longest_word_sender_id).name
             text += f"Longest word: <i>{self.longest_word.capitalize()}</i> from {longest_word_sender_name}\n"
         text += f"Game length: <code>{game_len_str}</code>"
         await self.send_message(text, parse_mode=types.ParseMode.HTML)
 
         del GAMES[self.group_id]
 
-    async def update_db(self) -> None:
-        async with pool.acquire() as conn:
-            # Insert game instance
-            await conn.execute(
-                """\
-                INSERT INTO game (group_id, players, game_mode, winner, start_time, end_time)
-                    VALUES ($1, $2, $3, $4, $5, $6);""",
+    def update_db(self) -> None:
+        # Results are written in the background together with those of other games
+        result_writer.submit(
+            GameResult(
                 self.group_id,
-                len(self.players),
                 self.__class__.__name__,
                 self.players_in_game[0].user_id if self.players_in_game else None,
                 self.start_time,
                 self.end_time,
+                [
+                    (
+                        player.user_id,
+                        self.roster.is_in_game(player),  # Support no winner in some game modes
+                        player.word_count,
+                        player.letter_count,
+                        player.longest_word or None,
+                    )
+                    for player in self.players
+                ],
             )
-            # Get game id
-            game_id = await conn.fetchval(
-                "SELECT id FROM game WHERE group_id = $1 AND start_time = $2;",
-                self.group_id,
-                self.start_time,
-            )
-        for player in self.players:  # Update db players in parallel
-            asyncio.create_task(self.update_db_player(game_id, player))
-
-    async def update_db_player(self, game_id: int, player: Player) -> None:
-        async with pool.acquire() as conn:
-            player_exists = bool(await conn.fetchval("SELECT id FROM player WHERE user_id = $1;", player.user_id))
-            if player_exists:  # Update player in db
-                await conn.execute(
-                    """\
-                    UPDATE player
-                    SET game_count = game_count + 1,
-                        win_count = win_count + $1,
-                        word_count = word_count + $2,
-                        letter_count = letter_count + $3,
-                        longest_word = CASE WHEN longest_word IS NULL THEN $4::TEXT
-                                            WHEN $4::TEXT IS NULL THEN longest_word
-                                            WHEN LENGTH($4::TEXT) > LENGTH(longest_word) THEN $4::TEXT
-                                            ELSE longest_word
-                                       END
-                    WHERE user_id = $5;""",
-                    int(player in self.players_in_game),  # Support no winner in some game modes
-                    player.word_count,
-                    player.letter_count,
-                    player.longest_word or None,
-                    player.user_id,
-                )
-            else:  # New player, create player in db
-                await conn.execute(
-                    """\
-                    INSERT INTO player (user_id, game_count, win_count, word_count, letter_count, longest_word)
-                        VALUES ($1, 1, $2, $3, $4, $5::TEXT);""",
-                    player.user_id,
-                    int(player in self.players_in_game),  # No winner in some game modes
-                    player.word_count,
-                    player.letter_count,
-                    player.longest_word or None,
-                )
+        )
 
-            # Create gameplayer in db
-            await conn.execute(
-                """\
-                INSERT INTO gameplayer (user_id, group_id, game_id, won, word_count, letter_count, longest_word)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7);""",
-                player.user_id,
-                self.group_id,
-                game_id,
-                player in self.players_in_game,
-                player.word_count,
-                player.letter_count,
-                player.longest_word or None,
-            )
+    async def handle_tick(self) -> bool:
+        # Return values
+        # True: Game has ended
+        # False: Game is still ongoing
+        if self.state == GameState.JOINING:
+            if self.time_left > 0:
+                return False
 
-    async def scan_for_stale_timer(self) -> None:
-        # Check if game timer is stuck
-        timer = self.time_left
-        for _ in range(5):
-            await asyncio.sleep(1)
-            if timer != self.time_left and timer >= 0:
-                return  # Timer not stuck
+            if len(self.players) < self.min_players:
+                await self.send_message("Not enough players. Game terminated.")
+                del GAMES[self.group_id]
+                return True
 
-        await send_admin_group(f"Prolonged stale/negative timer detected in group `{self.group_id}`. Game Terminated.")
-        try:
-            await self.send_message("Game timer is malfunctioning. Game terminated.")
-        except:
-            pass
+            # Show final roster before the game starts
+            if self.roster_timer:
+                self.roster_timer.cancel()
+            await self.send_roster()
+
+            self.state = GameState.RUNNING
+            await self.send_message("Game is starting...")
+
+            self.roster.start()
 
-        GAMES.pop(self.group_id, None)
+            await self.running_initialization()
+            await self.send_turn_message()
+        elif self.state == GameState.RUNNING:
+            if await self.running_phase_tick():
+                self.update_db()
+                return True
+        return False
 
     async def main_loop(self, message: types.Message) -> None:
-        # Attempt to fix issue of stuck game with negative timer.
-        negative_timer = 0
         try:
             await self.send_message(
                 f"A{'n' if self.name[0] in 'aeiou' else ''} {self.name} is starting.\n"
@@ -606,52 +913,45 @@ class ClassicGame:
                 f"{self.time_left}s to /join."
             )
             await self.join(message)
+            await self.send_roster()
 
             while True:
-                await asyncio.sleep(1)
-                if self.state == GameState.JOINING:
-                    if self.time_left > 0:
-                        self.time_left -= 1
-                        if self.time_left in (15, 30, 60):
-                            await self.send_message(f"{self.time_left}s left to /join.")
-                    else:
-                        if len(self.players) < self.min_players:
-                            await self.send_message("Not enough players. Game terminated.")
-                            del GAMES[self.group_id]
-                            return
-                        else:
-                            self.state = GameState.RUNNING
-                            await self.send_message("Game is starting...")
-
-                            random.shuffle(self.players)
-                            self.players_in_game = self.players[:]
-
-                            await self.running_initialization()
-                            await self.send_turn_message()
-                elif self.state == GameState.RUNNING:
-                    # Check for prolonged negative timer
-                    if self.time_left < 0:
-                        negative_timer += 1
-                    if negative_timer >= 5:
-                        raise ValueError("Prolonged negative timer.")
-
-                    if await self.running_phase_tick():  # True: Game ended
-                        await self.update_db()
-                        return
-                elif self.state == GameState.KILLGAME:
+                event, args = await self.inbox.get()
+                self.last_activity = loop.time()
+                if event == GameEvent.TICK:
+                    if args[0] == self.tick_id:  # Stale ticks are dropped
+                        self.ticks += 1
+                        if await self.handle_tick():  # True: Game ended
+                            break
+                elif event == GameEvent.KILL:
+                    self.state = GameState.KILLGAME
                     await self.send_message("Game ended forcibly.")
-                    del GAMES[self.group_id]
-                    return
+                    GAMES.pop(self.group_id, None)
+                    break
+                else:
+                    await self.event_handlers[event](*args)
+
+                # Messages produced while handling a burst of events are sent together
+                if self.inbox.empty():
+                    self.flush()
+            # Last messages are sent before the game is considered over
+            self.flush()
+            await self.wait_sent()
         except Exception as e:
             GAMES.pop(self.group_id, None)
             try:
                 await self.send_message(
-                    f"Game ended due to the following error:\n`{e.__class__.__name__}: {e}`.\n"
+                    f"Game ended due to the following error:\n"
+                    f"<code>{quote_html(f'{e.__class__.__name__}: {e}')}</code>.\n"
                     "My owner will be notified."
                 )
+                self.flush()
+                await self.wait_sent()
             except:
                 pass
             raise
+        finally:
+            self.cancel_all_timers()
 
 
 class HardModeGame(ClassicGame):
@@ -678,15 +978,13 @@ class ChaosGame(ClassicGame):
                 f"Total words: {self.turns}"
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
-
-        if self.players_in_game[0].is_vp:
-            await self.vp_answer()
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     async def running_initialization(self) -> None:
         # Random starting word
@@ -695,18 +993,17 @@ class ChaosGame(ClassicGame):
         self.start_time = datetime.now().replace(microsecond=0)
 
         # No turn order
-        await self.send_message(f"The first word is _{self.current_word.capitalize()}_.")
+        await self.send_message(f"The first word is <i>{self.current_word.capitalize()}</i>.")
 
     async def running_phase_tick(self) -> Optional[bool]:
         if self.answered:
             # Move player who just answered to the end of queue
-            self.players_in_game.append(self.players_in_game.pop(0))
+            self.roster.rotate()
 
             # Choose random player excluding the one who just answered and move to the start of queue
-            player = self.players_in_game.pop(random.randint(0, len(self.players_in_game) - 2))
-            self.players_in_game.insert(0, player)
+            # Turn order is not shown so the order of other players does not matter
+            self.roster.move_to_front(random.randint(0, len(self.players_in_game) - 2))
         else:
-            self.time_left -= 1
             if self.time_left > 0:
                 return
 
@@ -716,15 +1013,14 @@ class ChaosGame(ClassicGame):
                 f"{self.players_in_game[0].mention} ran out of time! They have been eliminated.",
                 parse_mode=types.ParseMode.HTML,
             )
-            del self.players_in_game[0]
+            self.roster.eliminate_current()
 
             if len(self.players_in_game) == 1:
                 await self.handle_game_end()
                 return True  # Game has ended
 
             # Choose random player and move to the start of queue
-            player = self.players_in_game.pop(random.randint(0, len(self.players_in_game) - 1))
-            self.players_in_game.insert(0, player)
+            self.roster.move_to_front(random.randint(0, len(self.players_in_game) - 1))
 
         await self.send_turn_message()
         return False  # Game is still ongoing
@@ -744,16 +1040,13 @@ class ChosenFirstLetterGame(ClassicGame):
                 f"Total words: {self.turns}"
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
-
-        if self.players_in_game[0].is_vp:
-            # self.current_word[-1] == self.current_word, code reuse go brrr
-            await self.vp_answer()
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     async def running_initialization(self) -> None:
         # Instead of storing the last used word like in other game modes,
@@ -788,15 +1081,13 @@ class BannedLettersGame(ClassicGame):
                 f"Total words: {self.turns}"
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
-
-        if self.players_in_game[0].is_vp:
-            await self.vp_answer()
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     def get_random_valid_answer(self) -> Optional[str]:
         return get_random_word(
@@ -807,11 +1098,12 @@ class BannedLettersGame(ClassicGame):
         )
 
     async def additional_answer_checkers(self, word: str, message: types.Message) -> bool:
-        used_banned_letters = sorted(set(word) & set(self.banned_letters))
-        if used_banned_letters:
-            await message.reply(
+        if not check_letters(word, banned_letters=self.banned_letters):
+            used_banned_letters = sorted(set(word) & set(self.banned_letters))
+            await self.reply(
+                message,
                 f"_{word.capitalize()}_ contains banned letters "
-                f"({', '.join(c.upper() for c in used_banned_letters)})."
+                f"({', '.join(c.upper() for c in used_banned_letters)}).",
             )
             return False
         return True
@@ -869,15 +1161,13 @@ class RequiredLetterGame(ClassicGame):
                 f"Total words: {self.turns}"
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
-
-        if self.players_in_game[0].is_vp:
-            await self.vp_answer()
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     def get_random_valid_answer(self) -> Optional[str]:
         return get_random_word(
@@ -888,8 +1178,8 @@ class RequiredLetterGame(ClassicGame):
         )
 
     async def additional_answer_checkers(self, word: str, message: types.Message) -> bool:
-        if self.required_letter not in word:
-            await message.reply(f"_{word.capitalize()}_ does not include _{self.required_letter}_.")
+        if not check_letters(word, required_letter=self.required_letter):
+            await self.reply(message, f"_{word.capitalize()}_ does not include _{self.required_letter}_.")
             return False
         return True
 
@@ -932,6 +1222,7 @@ class EliminationGame(ClassicGame):
         self.min_letters_limit = 1
 
         # Elimination game attributes
+        self.leaderboard: Optional[Leaderboard] = None  # Set when game starts
         self.round = 1
         self.turns_until_elimination = 0
         self.exceeded_score_limit = False  # Remind players that there is a turn score increment ceiling
@@ -942,55 +1233,7 @@ class EliminationGame(ClassicGame):
             await super().forcejoin(message)
 
     def get_leaderboard(self, show_player: Optional[Player] = None) -> str:
-        # nightmare nightmare nightmare nightmare
-
-        # Make a copy of players in game
-        players = self.players_in_game[:]
-        # Sort by letter count descending then user id ascending
-        # The user id part is to ensure consistent ordering of players with same letter count
-        players.sort(key=lambda k: (-k.score, k.user_id))
-        text = ""
-
-        if not show_player:
-            # Show every player
-            for i, p in enumerate(players, start=1):
-                text += f"{i}. {p.name}: {p.score}\n"
-            return text.rstrip()
-
-        # Highlight player (while showing 10 other players at max)
-        if len(players) <= 10:
-            # Show every player
-            for i, p in enumerate(players, start=1):
-                line = f"{i}. {p.name}: {p.score}\n"
-                if p is show_player:
-                    line = "> " + line
-                text += line
-        elif players.index(show_player) <= 4 or players.index(show_player) >= len(players) - 5:
-            # Player is in first or last 5 places, show those places
-            for i, p in enumerate(players[:5], start=1):
-                line = f"{i}. {p.name}: {p.score}\n"
-                if p is show_player:
-                    line = "> " + line
-                text += line
-            text += "...\n"
-            for i, p in enumerate(players[-5:], start=len(players) - 4):
-                line = f"{i}. {p.name}: {p.score}\n"
-                if p is show_player:
-                    line = "> " + line
-                text += line
-        else:
-            # Player not in first or last 5 places, show player in middle
-            for i, p in enumerate(players[:5], start=1):
-                text += f"{i}. {p.name}: {p.score}\n"
-            # Prevent awkward ellipses if player is 6th place from top or bottom
-            if players[5] is not show_player:
-                text += "...\n"
-            text += f"> {players.index(show_player) + 1}. {show_player.name}: {show_player.score}\n"
-            if players[-6] is not show_player:
-                text += "...\n"
-            for i, p in enumerate(players[-5:], start=len(players) - 4):
-                text += f"{i}. {p.name}: {p.score}\n"
-        return text.rstrip()
+        return self.leaderboard.render(show_player)
 
     async def send_turn_message(self) -> None:
         await self.send_message(
@@ -1004,22 +1247,29 @@ class EliminationGame(ClassicGame):
                   "Leaderboard:\n" + self.get_leaderboard(show_player=self.players_in_game[0])
             ),
             parse_mode=types.ParseMode.HTML,
+            priority=Priority.TURN,
         )
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     async def send_post_turn_message(self, word: str) -> None:
-        text = f"_{word.capitalize()}_ is accepted."
+        text = f"<i>{word.capitalize()}</i> is accepted."
         if self.exceeded_score_limit:
             text += f"\nThat is a long word! It will only count for {GameSettings.ELIM_MAX_TURN_SCORE} points."
             self.exceeded_score_limit = False
         await self.send_message(text)
         # No limit reduction
 
+    def post_turn_processing(self, word: str) -> None:
+        super().post_turn_processing(word)
+        self.leaderboard.update(self.players_in_game[0])
+
     async def running_initialization(self) -> None:
+        self.leaderboard = Leaderboard(self.players_in_game)
+
         # Random starting word
         self.current_word = get_random_word()
         self.used_words.add(self.current_word)
@@ -1036,7 +1286,6 @@ class EliminationGame(ClassicGame):
 
     async def running_phase_tick(self) -> bool:
         if not self.answered:
-            self.time_left -= 1
             if self.time_left > 0:
                 return False
             self.accepting_answers = False
@@ -1048,7 +1297,7 @@ class EliminationGame(ClassicGame):
         # Regardless of answering in time or running out of time
         # Elimination happens at the end of the round
         # Move player who just answered to the end of queue
-        self.players_in_game.append(self.players_in_game.pop(0))
+        self.roster.rotate()
         self.turns_until_elimination -= 1
 
         # Handle round transition
@@ -1075,8 +1324,14 @@ class EliminationGame(ClassicGame):
     async def handle_round_end(self) -> None:
         # Eliminate player(s) with lowest score
         # Hence the possibility of no winners
-        min_score = min(p.score for p in self.players_in_game)
-        eliminated = [p for p in self.players_in_game if p.score == min_score]
+        min_score = self.leaderboard[-1].score
+        eliminated_ids = set()
+        for i in range(len(self.leaderboard) - 1, -1, -1):
+            if self.leaderboard[i].score != min_score:
+                break
+            eliminated_ids.add(self.leaderboard[i].user_id)
+        # Mention eliminated players in turn order
+        eliminated = [p for p in self.players_in_game if p.user_id in eliminated_ids]
 
         await self.send_message(
             (
@@ -1092,7 +1347,8 @@ class EliminationGame(ClassicGame):
         )
 
         # Update attributes
-        self.players_in_game = [p for p in self.players_in_game if p not in eliminated]
+        self.roster.eliminate(eliminated)
+        self.leaderboard.remove(eliminated)
         self.round += 1
         self.turns_until_elimination = len(self.players_in_game)
 
@@ -1137,12 +1393,12 @@ class MixedEliminationGame(EliminationGame):
 
         text += f"You have <b>{self.time_limit}s</b> to answer.\n\n"
         text += "Leaderboard:\n" + self.get_leaderboard(show_player=self.players_in_game[0])
-        await self.send_message(text, parse_mode=types.ParseMode.HTML)
+        await self.send_message(text, parse_mode=types.ParseMode.HTML, priority=Priority.TURN)
 
         # Reset per-turn attributes
         self.answered = False
         self.accepting_answers = True
-        self.time_left = self.time_limit
+        self.turn_prompt = None  # Turn timer starts once the prompt is sent
 
     async def additional_answer_checkers(self, word: str, message: types.Message) -> bool:
         if self.game_mode is BannedLettersGame:
@@ -1157,17 +1413,19 @@ class MixedEliminationGame(EliminationGame):
         # Starting letter
         if self.game_mode is ChosenFirstLetterGame:
             if not word.startswith(self.current_word[0]):
-                await message.reply(f"_{word.capitalize()}_ does not start with _{self.current_word[0].upper()}_.")
+                await self.reply(
+                    message, f"_{word.capitalize()}_ does not start with _{self.current_word[0].upper()}_."
+                )
                 return
         elif not word.startswith(self.current_word[-1]):
-            await message.reply(f"_{word.capitalize()}_ does not start with _{self.current_word[-1].upper()}_.")
+            await self.reply(message, f"_{word.capitalize()}_ does not start with _{self.current_word[-1].upper()}_.")
             return
 
         if word in self.used_words:
-            await message.reply(f"_{word.capitalize()}_ has been used.")
+            await self.reply(message, f"_{word.capitalize()}_ has been used.")
             return
         if not check_word_existence(word):
-            await message.reply(f"_{word.capitalize()}_ is not in my list of words.")
+            await self.reply(message, f"_{word.capitalize()}_ is not in my list of words.")
             return
         if not await self.additional_answer_checkers(word, message):
             return
@@ -1181,6 +1439,7 @@ class MixedEliminationGame(EliminationGame):
             RequiredLetterGame.change_required_letter(self)
 
     async def running_initialization(self) -> None:
+        self.leaderboard = Leaderboard(self.players_in_game)
         self.start_time = datetime.now().replace(microsecond=0)
         self.turns_until_elimination = len(self.players_in_game)
         self.game_mode = random.choice(self.game_modes)
@@ -46,3 +46,64 @@ CREATE TABLE wordlist (
     accepted BOOLEAN NOT NULL,
     reason TEXT
 );
+
+-- Daily rollups for /trends, maintained when game results are written
+-- Rebuild them from game and gameplayer with /backfillstats
+CREATE TABLE daily_stats (
+    day DATE PRIMARY KEY,
+    game_count INTEGER NOT NULL,
+    active_groups INTEGER NOT NULL,
+    active_players INTEGER NOT NULL,
+    new_groups INTEGER NOT NULL,
+    new_players INTEGER NOT NULL
+);
+
+CREATE TABLE daily_game_mode (
+    day DATE NOT NULL,
+    game_mode TEXT NOT NULL,
+    game_count INTEGER NOT NULL,
+    PRIMARY KEY (day, game_mode)
+);
+
+CREATE TABLE daily_group (
+    day DATE NOT NULL,
+    group_id BIGINT NOT NULL,
+    PRIMARY KEY (day, group_id)
+);
+
+CREATE TABLE daily_player (
+    day DATE NOT NULL,
+    user_id BIGINT NOT NULL,
+    PRIMARY KEY (day, user_id)
+);
+
+CREATE TABLE first_group (
+    group_id BIGINT PRIMARY KEY,
+    day DATE NOT NULL
+);
+
+CREATE TABLE first_player (
+    user_id BIGINT PRIMARY KEY,
+    day DATE NOT NULL
+);
+
+-- Per group statistics for /groupstats, maintained when game results are written
+CREATE TABLE group_stats (
+    group_id BIGINT PRIMARY KEY,
+    player_count INTEGER NOT NULL,
+    game_count INTEGER NOT NULL,
+    word_count BIGINT NOT NULL,
+    letter_count BIGINT NOT NULL
+);
+
+CREATE TABLE group_player (
+    group_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    game_count INTEGER NOT NULL,
+    win_count INTEGER NOT NULL,
+    word_count INTEGER NOT NULL,
+    letter_count INTEGER NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+
+CREATE INDEX group_player_leaderboard ON group_player (group_id, win_count DESC, letter_count DESC);
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+# Stand-in Bot API server for measuring update handling of a local bot instance without Telegram
+# Set BOT_API_URL in the config to this server's address, e.g. http://127.0.0.1:8081
+# The bot's update mode is used as is: updates are pushed to its webhook if it sets one, and served to getUpdates
+# otherwise. Simulated users send /ping in a number of groups and reply latency is measured up to the bot's reply.
+# Usage: python local_api.py [--rate 100] [--duration 30] [--groups 50]
+
+PERCENTILES = (50, 90, 99)
+
+
+class LocalAPI:
+    def __init__(self, rate: float, duration: float, groups: int) -> None:
+        self.rate = rate  # Updates per second
+        self.duration = duration
+        self.groups = [-1001000000000 - i for i in range(groups)]
+        self.bot_id = 0
+        self.webhook_url: Optional[str] = None
+        self.bot_started = asyncio.Event()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        self.update_id = 0
+        self.message_ids: Dict[int, int] = {}  # Last message id in each chat
+        self.updates: List[Dict[str, Any]] = []  # Updates not yet fetched by getUpdates
+        self.new_updates = asyncio.Event()
+
+        self.sent_times: Dict[Tuple[int, int], float] = {}  # Chat and message id of sent updates mapped to time
+        self.latencies: List[float] = []
+        self.api_calls = 0
+        self.failed_deliveries = 0
+
+    def next_message_id(self, chat_id: int) -> int:
+        self.message_ids[chat_id] = self.message_ids.get(chat_id, 0) + 1
+        return self.message_ids[chat_id]
+
+    def make_message(self, chat_id: int, user_id: int, text: str, **kwargs: Any) -> Dict[str, Any]:
+        return {
+            "message_id": self.next_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Group {chat_id}"},
+            "from": {"id": user_id, "is_bot": user_id == self.bot_id, "first_name": f"User {user_id}"},
+            "text": text,
+            **kwargs,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.api_calls += 1
+        token, method = request.match_info["token"], request.match_info["method"].lower()
+        params: Dict[str, Any] = dict(request.query)
+        if request.content_type == "application/json":
+            params.update(await request.json())
+        else:
+            params.update(await request.post())
+
+        result: Any = True
+        if method == "getme":
+            self.bot_id = int(token.partition(":")[0])
+            result = {"id": self.bot_id, "is_bot": True, "first_name": "Local", "username": "localbot"}
+        elif method == "setwebhook":
+            self.webhook_url = params["url"]
+            self.bot_started.set()
+        elif method == "deletewebhook":
+            self.webhook_url = None
+        elif method == "getupdates":
+            self.bot_started.set()
+            offset = int(params.get("offset") or 0)
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            if not self.updates:
+                self.new_updates.clear()
+                try:
+                    await asyncio.wait_for(self.new_updates.wait(), float(params.get("timeout") or 0))
+                except asyncio.TimeoutError:
+                    pass
+            result = self.updates[:int(params.get("limit") or 100)]
+        elif method in ("sendmessage", "editmessagetext"):
+            chat_id = int(params["chat_id"])
+            reply_to = params.get("reply_to_message_id")
+            if reply_to is not None:
+                sent = self.sent_times.pop((chat_id, int(reply_to)), None)
+                if sent is not None:
+                    self.latencies.append(time.perf_counter() - sent)
+            result = self.make_message(chat_id, self.bot_id, params.get("text", ""))
+            if method == "editmessagetext":
+                result["message_id"] = int(params["message_id"])
+        elif method == "getchatmember":
+            user = {"id": int(params["user_id"]), "is_bot": False, "first_name": "User"}
+            result = {"user": user, "status": "member"}
+        return web.json_response({"ok": True, "result": result})
+
+    async def deliver(self, update: Dict[str, Any]) -> None:
+        if not self.webhook_url:
+            self.updates.append(update)
+            self.new_updates.set()
+            return
+        try:
+            async with self.session.post(self.webhook_url, json=update) as resp:
+                if resp.status != 200:
+                    self.failed_deliveries += 1
+        except aiohttp.ClientError:
+            self.failed_deliveries += 1
+
+    async def generate(self) -> None:
+        await self.bot_started.wait()
+        await asyncio.sleep(1)  # Let the bot finish starting up
+        print(f"Sending {self.rate:g} updates/s for {self.duration:g}s via {self.webhook_url or 'getUpdates'}")
+
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(self.rate * self.duration)):
+            # Evenly spaced updates
+            await asyncio.sleep(max(0.0, start + i / self.rate - time.perf_counter()))
+            chat_id = random.choice(self.groups)
+            self.update_id += 1
+            entities = [{"type": "bot_command", "offset": 0, "length": 5}]
+            message = self.make_message(chat_id, random.randint(1, 10 ** 6), "/ping", entities=entities)
+            self.sent_times[(chat_id, message["message_id"])] = time.perf_counter()
+            tasks.append(asyncio.create_task(self.deliver({"update_id": self.update_id, "message": message})))
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(5)  # Wait for remaining replies
+
+    def report(self) -> None:
+        sent = int(self.rate * self.duration)
+        print(f"Updates sent: {sent}, replied: {len(self.latencies)}, failed deliveries: {self.failed_deliveries}")
+        print(f"API calls received: {self.api_calls}")
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            print("Reply latency (ms): " + ", ".join(
+                f"p{p} {latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000:.1f}" for p in PERCENTILES
+            ) + f", max {latencies[-1] * 1000:.1f}")
+
+    async def run(self, host: str, port: int) -> None:
+        self.session = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"Bot API stand-in listening on http://{host}:{port}, waiting for the bot to start")
+        try:
+            await self.generate()
+            self.report()
+        finally:
+            await self.session.close()
+            await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stand-in Bot API server for local load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rate", type=float, default=100, help="updates sent per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to send updates for")
+    parser.add_argument("--groups", type=int, default=50, help="number of simulated groups")
+    args = parser.parse_args()
+    asyncio.run(LocalAPI(args.rate, args.duration, args.groups).run(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,44 @@
 import asyncio
-import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal, getcontext, ROUND_HALF_UP, InvalidOperation
+from functools import partial
+from hashlib import sha1
+from io import BytesIO
+from itertools import islice
 from random import seed
 from string import ascii_lowercase
 from time import time
-from typing import Dict, Any
 from uuid import uuid4
 
-import aiofiles
-import aiofiles.os
-import matplotlib.pyplot as plt
 from aiocache import cached
-from aiogram import executor, types
+from aiogram import types
 from aiogram.types.message import ContentTypes
 from aiogram.utils.exceptions import TelegramAPIError, BadRequest, MigrateToChat
 from aiogram.utils.markdown import quote_html
-from matplotlib.dates import DateFormatter
-from matplotlib.ticker import MaxNLocator
 
+from charts import ChartCache, render, render_trends
 from constants import (
     bot, on9bot, dp, VIP, VIP_GROUP, ADMIN_GROUP_ID, OFFICIAL_GROUP_ID, WORD_ADDITION_CHANNEL_ID,
-    GAMES, pool, PROVIDER_TOKEN, GameState, GameSettings, update_words, ADD_TO_GROUP_KEYBOARD
+    GAMES, pool, PROVIDER_TOKEN, GameEvent, GameState, GameSettings, update_words, add_words, ADD_TO_GROUP_KEYBOARD,
+    sender, loop, WEBHOOK_URL, WEBHOOK_HOST, WEBHOOK_PORT, UPDATE_WORKERS
 )
 from game import (
     ClassicGame, HardModeGame, ChaosGame, ChosenFirstLetterGame, BannedLettersGame,
     RequiredLetterGame, EliminationGame, MixedEliminationGame
 )
-from utils import send_admin_group, amt_donated, check_word_existence, has_star, filter_words
+from results import backfill_stats, result_writer
+from supervisor import supervisor
+from utils import send_admin_group, amt_donated, check_word_existence, has_star, migrate_group, search_prefix
+from updates import UpdatePools
+from webhook import WebhookServer
 
 seed(time())
 getcontext().rounding = ROUND_HALF_UP
 build_time = datetime.now().replace(microsecond=0)
 MAINT_MODE = False
+update_pools = UpdatePools(dp, UPDATE_WORKERS)
+trends_charts = ChartCache()  # Keyed by number of days and date
+GROUPSTATS_TOP_PLAYERS = 5
 
 
 async def private_only_command(message: types.Message) -> None:
@@ -182,7 +188,14 @@ async def cmd_runinfo(message: types.Message) -> None:
         f"Uptime: `{uptime.days}.{str(uptime).rsplit(maxsplit=1)[-1]}`\n"
         f"Total games: `{len(GAMES)}`\n"
         f"Running games: `{len([g for g in GAMES.values() if g.state == GameState.RUNNING])}`\n"
-        f"Players: `{sum(len(g.players) for g in GAMES.values())}`"
+        f"Players: `{sum(len(g.players) for g in GAMES.values())}`\n"
+        f"Game tasks: `{len(supervisor)}` (idle for 5 min: `{supervisor.idle_games(300)}`)\n"
+        f"Games started/finished/failed: `{supervisor.started}`/`{supervisor.finished}`/`{supervisor.failed}`\n"
+        f"Game ticks: `{sum(g.ticks for g in GAMES.values())}`\n"
+        f"Messages queued/sent/retried: `{len(sender)}`/`{sender.sent}`/`{sender.retries}`\n"
+        f"Updates queued/dropped: `{len(update_pools)}`/`{update_pools.dropped}`\n"
+        f"Game results pending/written/dropped: "
+        f"`{len(result_writer)}`/`{result_writer.written}`/`{result_writer.dropped}`"
     )
 
 
@@ -209,7 +222,7 @@ async def cmd_playinggroups(message: types.Message) -> None:
             text + (
                 f" <code>{group_id}</code> "
                 f"{len(GAMES[group_id].players_in_game)}/{len(GAMES[group_id].players)}P "
-                f"Timer: {GAMES[group_id].time_left}s"
+                f"Timer: {GAMES[group_id].time_left}s Ticks: {GAMES[group_id].ticks}"
             )
         )
 
@@ -244,14 +257,14 @@ async def cmd_startclassic(message: types.Message) -> None:
         return
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:  # Only stop people from starting games, not joining
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
         return
     game = ClassicGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="starthard")
@@ -262,7 +275,7 @@ async def cmd_starthard(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -270,7 +283,7 @@ async def cmd_starthard(message: types.Message) -> None:
 
     game = HardModeGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startchaos")
@@ -281,7 +294,7 @@ async def cmd_startchaos(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -289,7 +302,7 @@ async def cmd_startchaos(message: types.Message) -> None:
 
     game = ChaosGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startcfl")
@@ -300,7 +313,7 @@ async def cmd_startcfl(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -308,7 +321,7 @@ async def cmd_startcfl(message: types.Message) -> None:
 
     game = ChosenFirstLetterGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startbl")
@@ -319,7 +332,7 @@ async def cmd_startbl(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -327,7 +340,7 @@ async def cmd_startbl(message: types.Message) -> None:
 
     game = BannedLettersGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startrl")
@@ -338,7 +351,7 @@ async def cmd_startrl(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -346,7 +359,7 @@ async def cmd_startrl(message: types.Message) -> None:
 
     game = RequiredLetterGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startelim")
@@ -357,7 +370,7 @@ async def cmd_startelim(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -365,7 +378,7 @@ async def cmd_startelim(message: types.Message) -> None:
 
     game = EliminationGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="startmelim")
@@ -387,7 +400,7 @@ async def cmd_startmixedelim(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
         return
     if MAINT_MODE:
         await message.reply("Maintenance mode is on. Games are temporarily disabled.")
@@ -395,7 +408,7 @@ async def cmd_startmixedelim(message: types.Message) -> None:
 
     game = MixedEliminationGame(message.chat.id)
     GAMES[group_id] = game
-    await game.main_loop(message)
+    supervisor.start(game, message)
 
 
 @dp.message_handler(commands="join")
@@ -406,7 +419,7 @@ async def cmd_join(message: types.Message) -> None:
 
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].join(message)
+        GAMES[group_id].post(GameEvent.JOIN, message)
     # No reply is given when there is no running game in case the user was joining another game
 
 
@@ -425,42 +438,42 @@ async def cmd_forcejoin(message: types.Message) -> None:
                 disable_web_page_preview=True,
             )
             return
-    await GAMES[message.chat.id].forcejoin(message)
+    GAMES[message.chat.id].post(GameEvent.FORCEJOIN, message)
 
 
 @dp.message_handler(is_group=True, commands="extend")
 async def cmd_extend(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].extend(message)
+        GAMES[group_id].post(GameEvent.EXTEND, message)
 
 
 @dp.message_handler(is_group=True, is_admin=True, commands="forcestart")
 async def cmd_forcestart(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES and GAMES[group_id].state == GameState.JOINING:
-        GAMES[group_id].time_left = -99999
+        GAMES[group_id].post(GameEvent.FORCESTART)
 
 
 @dp.message_handler(is_group=True, commands="flee")
 async def cmd_flee(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].flee(message)
+        GAMES[group_id].post(GameEvent.FLEE, message)
 
 
 @dp.message_handler(is_group=True, is_owner=True, commands="forceflee")
 async def cmd_forceflee(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].forceflee(message)
+        GAMES[group_id].post(GameEvent.FORCEFLEE, message)
 
 
 @dp.message_handler(is_group=True, is_owner=True, commands=["killgame", "killgaym"])
 async def cmd_killgame(message: types.Message) -> None:
     group_id = int(message.get_args() or message.chat.id)
     if group_id in GAMES:
-        GAMES[group_id].state = GameState.KILLGAME
+        GAMES[group_id].post(GameEvent.KILL)
         await asyncio.sleep(2)
         if group_id in GAMES:
             del GAMES[group_id]
@@ -471,7 +484,7 @@ async def cmd_killgame(message: types.Message) -> None:
 async def cmd_forceskip(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES and GAMES[group_id].state == GameState.RUNNING and not GAMES[group_id].answered:
-        GAMES[group_id].time_left = 0
+        GAMES[group_id].post(GameEvent.FORCESKIP)
 
 
 @dp.message_handler(is_group=True, commands="addvp")
@@ -485,14 +498,14 @@ async def addvp(message: types.Message) -> None:
             disable_web_page_preview=True,
         )
         return
-    await GAMES[group_id].addvp(message)
+    GAMES[group_id].post(GameEvent.ADDVP, message)
 
 
 @dp.message_handler(is_group=True, commands="remvp")
 async def remvp(message: types.Message) -> None:
     group_id = message.chat.id
     if group_id in GAMES:
-        await GAMES[group_id].remvp(message)
+        GAMES[group_id].post(GameEvent.REMVP, message)
 
 
 @dp.message_handler(is_group=True, is_owner=True, commands="incmaxp")
@@ -557,29 +570,49 @@ async def cmd_stats(message: types.Message) -> None:
 
 
 @dp.message_handler(commands="groupstats")
-async def cmd_groupstats(message: types.Message) -> None:  # TODO: Add top players in group (up to 5?)
+async def cmd_groupstats(message: types.Message) -> None:
     if message.chat.id > 0:
         await groups_only_command(message)
         return
 
+    # Read from totals maintained as game results are written
     async with pool.acquire() as conn:
-        player_cnt, game_cnt, word_cnt, letter_cnt = await conn.fetchrow(
+        stats = await conn.fetchrow(
+            "SELECT player_count, game_count, word_count, letter_count FROM group_stats WHERE group_id = $1;",
+            message.chat.id,
+        )
+        top_players = await conn.fetch(
             """\
-            SELECT COUNT(DISTINCT user_id), COUNT(DISTINCT game_id), SUM(word_count), SUM(letter_count)
-                FROM gameplayer
-                WHERE group_id = $1;""",
+            SELECT user_id, win_count, letter_count
+                FROM group_player
+                WHERE group_id = $1
+                ORDER BY win_count DESC, letter_count DESC
+                LIMIT $2;""",
             message.chat.id,
+            GROUPSTATS_TOP_PLAYERS,
         )
-    await message.reply(
-        (
-            f"\U0001f4ca Statistics for <b>{quote_html(message.chat.title)}</b>\n"
-            f"<b>{player_cnt}</b> players\n"
-            f"<b>{game_cnt}</b> games played\n"
-            f"<b>{word_cnt}</b> total words played\n"
-            f"<b>{letter_cnt}</b> total letters played"
-        ),
-        parse_mode=types.ParseMode.HTML,
+    player_cnt, game_cnt, word_cnt, letter_cnt = stats or (0, 0, 0, 0)
+
+    async def get_name(user_id: int) -> str:
+        try:
+            return quote_html((await bot.get_chat_member(message.chat.id, user_id)).user.full_name)
+        except TelegramAPIError:  # Left group or deleted account
+            return f"<code>{user_id}</code>"
+
+    names = await asyncio.gather(*[get_name(row["user_id"]) for row in top_players])
+    text = (
+        f"\U0001f4ca Statistics for <b>{quote_html(message.chat.title)}</b>\n"
+        f"<b>{player_cnt}</b> players\n"
+        f"<b>{game_cnt}</b> games played\n"
+        f"<b>{word_cnt}</b> total words played\n"
+        f"<b>{letter_cnt}</b> total letters played"
     )
+    if top_players:
+        text += "\n\nTop players:\n" + "\n".join(
+            f"{i}. {name}: <b>{row['win_count']}</b> wins, <b>{row['letter_count']}</b> letters"
+            for i, (name, row) in enumerate(zip(names, top_players), start=1)
+        )
+    await message.reply(text, parse_mode=types.ParseMode.HTML)
 
 
 @cached(ttl=5)
@@ -607,7 +640,7 @@ async def cmd_globalstats(message: types.Message) -> None:
 
 
 @dp.message_handler(is_owner=True, commands=["trend", "trends"])
-async def cmd_trends(message: types.Message) -> None:  # TODO: Optimize
+async def cmd_trends(message: types.Message) -> None:
     try:
         days = int(message.get_args() or 7)
         assert days > 1, "smh"
@@ -615,210 +648,54 @@ async def cmd_trends(message: types.Message) -> None:  # TODO: Optimize
         await message.reply(f"`{e.__class__.__name__}: {str(e)}`")
         return
 
+    # Charts are cached for the day, including charts being rendered
     d = datetime.now().date()
-    tp = [d - timedelta(days=i) for i in range(days - 1, -1, -1)]
-    f = DateFormatter("%b %d" if days < 180 else "%b" if days < 335 else "%b %Y")
-
-    async def get_daily_games() -> Dict[str, Any]:
-        async with pool.acquire() as conn:
-            return dict(
-                await conn.fetch(
-                    """\
-                    SELECT start_time::DATE d, COUNT(start_time::DATE)
-                        FROM game
-                        WHERE start_time::DATE >= $1
-                        GROUP BY d
-                        ORDER BY d;""",
-                    d - timedelta(days=days - 1),
-                )
-            )
-
-    async def get_active_players() -> Dict[str, Any]:
-        async with pool.acquire() as conn:
-            return dict(
-                await conn.fetch(
-                    """\
-                    SELECT game.start_time::DATE d, COUNT(DISTINCT gameplayer.user_id)
-                        FROM gameplayer
-                        INNER JOIN game ON gameplayer.game_id = game.id
-                        WHERE game.start_time::DATE >= $1
-                        GROUP BY d
-                        ORDER BY d;""",
-                    d - timedelta(days=days - 1),
-                )
-            )
+    trends_charts.retain(lambda key: key[1] == d)
+    chart = await trends_charts.get((days, d), partial(get_trends_chart, days, d))
+    await message.reply_photo(types.InputFile(BytesIO(chart), filename="trends.jpg"))
 
-    async def get_active_groups() -> Dict[str, Any]:
-        async with pool.acquire() as conn:
-            return dict(
-                await conn.fetch(
-                    """\
-                    SELECT start_time::DATE d, COUNT(DISTINCT group_id)
-                        FROM game
-                        WHERE game.start_time::DATE >= $1
-                        GROUP BY d
-                        ORDER BY d;""",
-                    d - timedelta(days=days - 1),
-                )
-            )
 
-    async def get_cumulative_groups() -> Dict[str, Any]:
-        async with pool.acquire() as conn:
-            return dict(
-                await conn.fetch(
-                    """\
-                    SELECT *
-                        FROM (
-                            SELECT d, SUM(count) OVER (ORDER BY d)
-                                FROM (
-                                    SELECT d, COUNT(group_id)
-                                        FROM (
-                                            SELECT DISTINCT group_id, MIN(start_time::DATE) d
-                                                FROM game
-                                                GROUP BY group_id
-                                        ) gd
-                                        GROUP BY d
-                                ) dg
-                        ) ds
-                        WHERE d >= $1;""",
-                    d - timedelta(days=days - 1),
-                )
-            )
-
-    daily_games, active_players, active_groups, cumulative_groups = await asyncio.gather(
-        get_daily_games(), get_active_players(), get_active_groups(), get_cumulative_groups()
-    )
+async def get_trends_chart(days: int, d: date) -> bytes:
+    tp = [d - timedelta(days=i) for i in range(days - 1, -1, -1)]
 
-    # TODO: Figure out what this does
+    # Only daily rollups are read, which are maintained as game results are written
+    start = tp[0]
     async with pool.acquire() as conn:
-        dt = d - timedelta(days=days)
-        for i in range(days):
-            dt += timedelta(days=1)
-            if dt not in cumulative_groups:
-                if not i:
-                    cumulative_groups[dt] = await conn.fetchval(
-                        "SELECT COUNT(DISTINCT group_id) FROM game WHERE start_time::DATE <= $1;",
-                        dt,
-                    )
-                else:
-                    cumulative_groups[dt] = cumulative_groups[dt - timedelta(days=1)]
-        cumulative_players = dict(
-            await conn.fetch(
-                """\
-                SELECT *
-                    FROM (
-                        SELECT d, SUM(count) OVER (ORDER BY d)
-                            FROM (
-                                SELECT d, COUNT(user_id)
-                                    FROM (
-                                        SELECT DISTINCT user_id, MIN(start_time::DATE) d
-                                            FROM gameplayer
-                                            INNER JOIN game ON game_id = game.id
-                                            GROUP BY user_id
-                                    ) ud
-                                    GROUP BY d
-                            ) du
-                    ) ds
-                    WHERE d >= $1;""",
-                d - timedelta(days=days - 1),
-            )
+        daily_stats = {row["day"]: row for row in await conn.fetch("SELECT * FROM daily_stats WHERE day >= $1;", start)}
+        group_count, player_count = await conn.fetchrow(
+            "SELECT COALESCE(SUM(new_groups), 0), COALESCE(SUM(new_players), 0) FROM daily_stats WHERE day < $1;",
+            start,
         )
-        dt = d - timedelta(days=days)
-        for i in range(days):
-            dt += timedelta(days=1)
-            if dt not in cumulative_players:
-                if not i:
-                    cumulative_players[dt] = await conn.fetchval(
-                        """\
-                        SELECT COUNT(DISTINCT user_id)
-                            FROM gameplayer
-                            INNER JOIN game ON game_id = game.id
-                            WHERE start_time <= $1;""",
-                        dt,
-                    )
-                else:
-                    cumulative_players[dt] = cumulative_players[dt - timedelta(days=1)]
         game_mode_play_cnt = await conn.fetch(
             """\
-            SELECT COUNT(game_mode), game_mode
-                FROM game
-                WHERE start_time::DATE >= $1
+            SELECT SUM(game_count), game_mode
+                FROM daily_game_mode
+                WHERE day >= $1
                 GROUP BY game_mode
-                ORDER BY count;""",
-            d - timedelta(days=days - 1),
+                ORDER BY sum;""",
+            start,
         )
-    total_games = sum(i[0] for i in game_mode_play_cnt)
-
-    while os.path.exists("trends.jpg"):  # Another /trend command has not finished processing
-        await asyncio.sleep(0.1)
-
-    plt.figure(figsize=(15, 8))
-    plt.subplots_adjust(hspace=0.4)
-    plt.suptitle(f"Trends in the Past {days} Days", size=25)
-
-    # Draw the 6 subplots
-
-    sp = plt.subplot(231)
-    sp.xaxis.set_major_formatter(f)
-    sp.yaxis.set_major_locator(MaxNLocator(integer=True))  # Force y-axis intervals to be integral
-    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
-    plt.title("Games Played", size=18)
-    plt.plot(tp, [daily_games.get(i, 0) for i in tp])
-    plt.ylim(ymin=0)
-
-    sp = plt.subplot(232)
-    sp.xaxis.set_major_formatter(f)
-    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
-    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
-    plt.title("Active Groups", size=18)
-    plt.plot(tp, [active_groups.get(i, 0) for i in tp])
-    plt.ylim(ymin=0)
-
-    sp = plt.subplot(233)
-    sp.xaxis.set_major_formatter(f)
-    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
-    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
-    plt.title("Active Players", size=18)
-    plt.plot(tp, [active_players.get(i, 0) for i in tp])
-    plt.ylim(ymin=0)
-
-    plt.subplot(234)
-    labels = [i[1] for i in game_mode_play_cnt]
-    colors = [
-                 "dark maroon", "dark peach", "orange", "leather", "mustard", "teal", "french blue", "booger"
-             ][8 - len(game_mode_play_cnt):]
-    slices, text = plt.pie(
-        [i[0] for i in game_mode_play_cnt],
-        labels=[
-            f"{i[0] / total_games:.1%} ({i[0]})" if i[0] / total_games >= 0.03 else "" for i in game_mode_play_cnt
-        ],
-        colors=["xkcd:" + c for c in colors],
-        startangle=90,
-    )
-    plt.legend(slices, labels, title="Game Modes Played", fontsize="x-small", loc="best")
-    plt.axis("equal")
-
-    sp = plt.subplot(235)
-    sp.xaxis.set_major_formatter(f)
-    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
-    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
-    plt.title("Cumulative Groups", size=18)
-    plt.plot(tp, [cumulative_groups[i] for i in tp])
 
-    sp = plt.subplot(236)
-    sp.xaxis.set_major_formatter(f)
-    sp.yaxis.set_major_locator(MaxNLocator(integer=True))
-    plt.setp(sp.xaxis.get_majorticklabels(), rotation=45, horizontalalignment="right")
-    plt.title("Cumulative Players", size=18)
-    plt.plot(tp, [cumulative_players[i] for i in tp])
-
-    # Save the plot as a jpg and send it
-
-    plt.savefig("trends.jpg", bbox_inches="tight")
-    plt.close("all")
-    async with aiofiles.open("trends.jpg", "rb") as f:
-        await message.reply_photo(f)
-    await aiofiles.os.remove("trends.jpg")
+    cumulative_groups = []
+    cumulative_players = []
+    for day in tp:
+        if day in daily_stats:
+            group_count += daily_stats[day]["new_groups"]
+            player_count += daily_stats[day]["new_players"]
+        cumulative_groups.append(group_count)
+        cumulative_players.append(player_count)
+
+    return await render(
+        render_trends,
+        days,
+        tp,
+        [daily_stats[day]["game_count"] if day in daily_stats else 0 for day in tp],
+        [daily_stats[day]["active_groups"] if day in daily_stats else 0 for day in tp],
+        [daily_stats[day]["active_players"] if day in daily_stats else 0 for day in tp],
+        [tuple(row) for row in game_mode_play_cnt],
+        cumulative_groups,
+        cumulative_players,
+    )
 
 
 @dp.message_handler(commands="donate")
@@ -1062,7 +939,7 @@ async def cmd_addwords(message: types.Message) -> None:
     msg = await message.reply(text.rstrip())
     if not words_to_add:
         return
-    await update_words()
+    await add_words(words_to_add)
     await msg.edit_text(msg.md_text + "\n\nWord list updated.")
     await bot.send_message(
         WORD_ADDITION_CHANNEL_ID,
@@ -1071,6 +948,25 @@ async def cmd_addwords(message: types.Message) -> None:
     )
 
 
+@dp.message_handler(is_owner=True, commands="updatewords")
+async def cmd_updatewords(message: types.Message) -> None:
+    # Retrieve the latest words from online repo
+    msg = await message.reply("Updating word list...")
+    if await update_words(refresh=True):
+        await msg.edit_text("Word list updated.")
+    else:
+        await msg.edit_text("Failed to retrieve words from online repo. Word list reloaded from local snapshot.")
+
+
+@dp.message_handler(is_owner=True, commands="backfillstats")
+async def cmd_backfillstats(message: types.Message) -> None:
+    # Rebuild daily rollups used by /trends and group statistics from all games
+    msg = await message.reply("Rebuilding statistics...")
+    t = time()
+    await backfill_stats()
+    await msg.edit_text(f"Statistics rebuilt in `{time() - t:.1f}s`.")
+
+
 @dp.message_handler(is_owner=True, commands="rejword")
 async def cmd_rejword(message: types.Message) -> None:
     arg = message.get_args()
@@ -1135,7 +1031,7 @@ async def message_handler(message: types.Message) -> None:
             # TODO: Modify to support other languages
             and all([c in ascii_lowercase for c in message.text.lower()])
     ):
-        await GAMES[group_id].handle_answer(message)
+        GAMES[group_id].post(GameEvent.ANSWER, message)
 
 
 @dp.inline_handler()
@@ -1145,43 +1041,43 @@ async def inline_handler(inline_query: types.InlineQuery):
         await inline_query.answer(
             [
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startclassic",
                     title="Start a classic game",
                     description="/startclassic@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startclassic@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="starthard",
                     title="Start a hard mode game",
                     description="/starthard@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/starthard@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startchaos",
                     title="Start a chaos game",
                     description="/startchaos@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startchaos@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startcfl",
                     title="Start a chosen first letter game",
                     description="/startcfl@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startcfl@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startbl",
                     title="Start a banned letters game",
                     description="/startbl@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startbl@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startrl",
                     title="Start a required letter game",
                     description="/startrl@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startrl@on9wordchainbot"),
                 ),
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="startelim",
                     title="Start an elimination game",
                     description="/startelim@on9wordchainbot",
                     input_message_content=types.InputTextMessageContent("/startelim@on9wordchainbot"),
@@ -1195,7 +1091,7 @@ async def inline_handler(inline_query: types.InlineQuery):
         await inline_query.answer(
             [
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id="invalidquery",
                     title="A query can only consist of alphabets",
                     description="Try a different query",
                     input_message_content=types.InputTextMessageContent(r"¯\\_(ツ)\_/¯"),
@@ -1205,29 +1101,43 @@ async def inline_handler(inline_query: types.InlineQuery):
         )
         return
 
-    res = []
-    for i in filter_words(starting_letter=text[0]):
-        if i.startswith(text):
-            i = i.capitalize()
-            res.append(
+    try:
+        offset = max(int(inline_query.offset or 0), 0)
+    except ValueError:
+        offset = 0
+    words, word_cnt = search_prefix(text, offset)
+    words = list(islice(words, 50))  # Max 50 results per page
+    if not words and not offset:
+        await inline_query.answer(
+            [
                 types.InlineQueryResultArticle(
-                    id=str(uuid4()),
-                    title=i,
-                    input_message_content=types.InputTextMessageContent(i),
+                    id="noresults",
+                    title="No results found",
+                    description="Try a different query",
+                    input_message_content=types.InputTextMessageContent(r"¯\\_(ツ)\_/¯"),
                 )
-            )
-            if len(res) == 50:  # Max 50 results
-                break
-    if not res:  # No results
-        res.append(
+            ],
+            cache_time=60,  # Short so that words added meanwhile show up soon
+            is_personal=True,
+        )
+        return
+
+    await inline_query.answer(
+        [
             types.InlineQueryResultArticle(
-                id=str(uuid4()),
-                title="No results found",
-                description="Try a different query",
-                input_message_content=types.InputTextMessageContent(r"¯\\_(ツ)\_/¯"),
+                # Stable ids so that results can be cached by Telegram, hashed to fit the 64 byte limit on any word
+                id=sha1(w.encode()).hexdigest(),
+                title=w.capitalize(),
+                input_message_content=types.InputTextMessageContent(w.capitalize()),
             )
-        )
-    await inline_query.answer(res, is_personal=True)
+            for w in words
+        ],
+        cache_time=3600,  # Word list rarely changes
+        is_personal=True,
+        next_offset=str(offset + len(words)) if offset + len(words) < word_cnt else "",
+        switch_pm_text=f"{word_cnt} word{'' if word_cnt == 1 else 's'} found",
+        switch_pm_parameter="help",
+    )
 
 
 @dp.callback_query_handler()
@@ -1240,28 +1150,8 @@ async def callback_query_handler(callback_query: types.CallbackQuery) -> None:
 
 @dp.errors_handler(exception=Exception)
 async def error_handler(update: types.Update, error: TelegramAPIError) -> None:
-    for game in GAMES.values():  # TODO: Do this for group in which error occurs only
-        asyncio.create_task(game.scan_for_stale_timer())
-
     if isinstance(error, MigrateToChat):
-        if update.message.chat.id in GAMES:  # TODO: Test
-            old_gid = GAMES[update.message.chat.id].group_id
-            GAMES[error.migrate_to_chat_id] = GAMES.pop(update.message.chat.id)
-            GAMES[error.migrate_to_chat_id].group_id = error.migrate_to_chat_id
-            asyncio.create_task(
-                send_admin_group(f"Game moved from {old_gid} to {error.migrate_to_chat_id}.")
-            )
-        async with pool.acquire() as conn:
-            await conn.execute(
-                """\
-                UPDATE game SET group_id = $1 WHERE group_id = $2;
-                UPDATE gameplayer SET group_id = $1 WHERE group_id = $2;
-                DELETE FROM game WHERE group_id = $2;
-                DELETE FROM gameplayer WHERE group_id = $2;""",
-                error.migrate_to_chat_id,
-                update.message.chat.id,
-            )
-        await send_admin_group(f"Group migrated to {error.migrate_to_chat_id}.")
+        await migrate_group(update.message.chat.id, error.migrate_to_chat_id)
         return
 
     send_admin_msg = await send_admin_group(
@@ -1281,7 +1171,7 @@ async def error_handler(update: types.Update, error: TelegramAPIError) -> None:
         asyncio.create_task(
             send_admin_msg.reply(f"Killing game in {update.message.chat.id} consequently.")
         )
-        GAMES[update.message.chat.id].state = GameState.KILLGAME
+        GAMES[update.message.chat.id].post(GameEvent.KILL)
         await asyncio.sleep(2)
         try:
             del GAMES[update.message.chat.id]
@@ -1291,7 +1181,13 @@ async def error_handler(update: types.Update, error: TelegramAPIError) -> None:
 
 
 def main() -> None:
-    executor.start_polling(dp, skip_updates=True)
+    try:
+        if WEBHOOK_URL:
+            WebhookServer(update_pools, WEBHOOK_URL).run(loop, WEBHOOK_HOST, WEBHOOK_PORT)
+        else:
+            update_pools.run_polling(loop)
+    finally:
+        loop.run_until_complete(result_writer.close())
 
 
 if __name__ == "__main__":
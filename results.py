@@ -0,0 +1,476 @@
+import asyncio
+import logging
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from constants import pool
+
+logger = logging.getLogger(__name__)
+
+# User id, won, word count, letter count and longest word of a player in a game
+PlayerResult = Tuple[int, bool, int, int, Optional[str]]
+
+# Errors from which the database is expected to recover, batches are retried after them
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,
+)
+
+
+class GameResult:
+    __slots__ = ("group_id", "game_mode", "winner", "start_time", "end_time", "players")
+
+    def __init__(
+        self,
+        group_id: int,
+        game_mode: str,
+        winner: Optional[int],
+        start_time: datetime,
+        end_time: datetime,
+        players: List[PlayerResult],
+    ) -> None:
+        self.group_id = group_id
+        self.game_mode = game_mode
+        self.winner = winner
+        self.start_time = start_time
+        self.end_time = end_time
+        self.players = players
+
+
+class ResultWriter:
+    # Write-behind queue of game results so that games end without waiting for the database
+    # Results of several games are written in one transaction, once enough games are pending or after a short delay
+    # Batches are retried with exponential backoff while the database is unavailable, and kept in order meanwhile
+
+    BATCH_SIZE = 50  # Games per transaction
+    FLUSH_INTERVAL = 0.5  # Seconds a result may wait for more games before being written
+    MAX_PENDING = 10000  # Results of later games are dropped while this many are pending
+    MAX_BACKOFF = 60
+    CLOSE_ATTEMPTS = 3
+
+    def __init__(self) -> None:
+        self.pending: Deque[GameResult] = deque()
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()  # Held while a batch is written, taken by others to pause writing
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.written = 0
+        self.dropped = 0
+        self.retries = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def submit(self, result: GameResult) -> None:
+        if len(self.pending) >= self.MAX_PENDING:
+            self.dropped += 1
+            logger.error(f"Result queue full, dropped game in group {result.group_id}")
+            return
+        self.pending.append(result)
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+        if len(self.pending) >= self.BATCH_SIZE:
+            self.wakeup.set()
+
+    async def run(self) -> None:
+        while not self.closing:
+            if len(self.pending) < self.BATCH_SIZE:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+        await self.flush()
+
+    async def flush(self) -> None:
+        backoff = 1
+        failures = 0
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(self.BATCH_SIZE, len(self.pending)))]
+            try:
+                await self.write_batch(batch)
+            except TRANSIENT_ERRORS:
+                self.pending.extendleft(reversed(batch))
+                self.retries += 1
+                failures += 1
+                if self.closing and failures >= self.CLOSE_ATTEMPTS:
+                    logger.exception(f"Database unavailable on shutdown, {len(self.pending)} game results are lost")
+                    return
+                logger.exception(f"Failed to write {len(batch)} game results, retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+            except Exception:
+                logger.exception(f"Failed to write {len(batch)} game results, writing them one by one")
+                await self.write_each(batch)
+            else:
+                backoff = 1
+                failures = 0
+
+    async def write_each(self, batch: List[GameResult]) -> None:
+        # Find the results which cannot be written and drop them instead of retrying them forever
+        for i, result in enumerate(batch):
+            try:
+                await self.write_batch([result])
+            except TRANSIENT_ERRORS:
+                self.pending.extendleft(reversed(batch[i:]))  # Retried as usual
+                return
+            except Exception:
+                self.dropped += 1
+                logger.exception(f"Dropped result of game in group {result.group_id}")
+
+    def migrate(self, old_group_id: int, new_group_id: int) -> None:
+        # Pending results of a group upgraded to a supergroup are written for the supergroup
+        for result in self.pending:
+            if result.group_id == old_group_id:
+                result.group_id = new_group_id
+
+    async def close(self) -> None:
+        # Write every pending result on shutdown, giving up after a few attempts if the database is unavailable
+        self.closing = True
+        self.wakeup.set()
+        if self.task:
+            await self.task
+
+    async def write_batch(self, batch: List[GameResult]) -> None:
+        async with self.lock:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await self.write(conn, batch)
+        self.written += len(batch)
+
+    async def write(self, conn: asyncpg.Connection, batch: List[GameResult]) -> None:
+        # Games are identified by group and start time
+        game_ids: Dict[Tuple[int, datetime], int] = {
+            (row["group_id"], row["start_time"]): row["id"]
+            for row in await conn.fetch(
+                """\
+                INSERT INTO game (group_id, players, game_mode, winner, start_time, end_time)
+                    SELECT * FROM unnest(
+                        $1::BIGINT[], $2::INTEGER[], $3::TEXT[], $4::BIGINT[], $5::TIMESTAMP[], $6::TIMESTAMP[]
+                    )
+                    RETURNING id, group_id, start_time;""",
+                [r.group_id for r in batch],
+                [len(r.players) for r in batch],
+                [r.game_mode for r in batch],
+                [r.winner for r in batch],
+                [r.start_time for r in batch],
+                [r.end_time for r in batch],
+            )
+        }
+
+        # A player may have played several games of the batch, so they are combined into one row per player
+        # Longest words are combined in game order as the database would
+        players: Dict[int, List] = {}  # User id mapped to game, win, word and letter count and longest word
+        for result in batch:
+            for user_id, won, word_count, letter_count, longest_word in result.players:
+                totals = players.get(user_id)
+                if not totals:
+                    players[user_id] = [1, int(won), word_count, letter_count, longest_word]
+                    continue
+                totals[0] += 1
+                totals[1] += won
+                totals[2] += word_count
+                totals[3] += letter_count
+                if longest_word and (not totals[4] or len(longest_word) > len(totals[4])):
+                    totals[4] = longest_word
+        await conn.execute(
+            """\
+            INSERT INTO player (user_id, game_count, win_count, word_count, letter_count, longest_word)
+                SELECT * FROM unnest(
+                    $1::BIGINT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[], $5::INTEGER[], $6::TEXT[]
+                )
+            ON CONFLICT (user_id) DO UPDATE
+            SET game_count = player.game_count + excluded.game_count,
+                win_count = player.win_count + excluded.win_count,
+                word_count = player.word_count + excluded.word_count,
+                letter_count = player.letter_count + excluded.letter_count,
+                longest_word = CASE WHEN player.longest_word IS NULL THEN excluded.longest_word
+                                    WHEN excluded.longest_word IS NULL THEN player.longest_word
+                                    WHEN LENGTH(excluded.longest_word) > LENGTH(player.longest_word)
+                                        THEN excluded.longest_word
+                                    ELSE player.longest_word
+                               END;""",
+            list(players),
+            *([totals[i] for totals in players.values()] for i in range(5)),
+        )
+
+        await conn.copy_records_to_table(
+            "gameplayer",
+            records=[
+                (user_id, r.group_id, game_ids[(r.group_id, r.start_time)], won, word_count, letter_count, longest_word)
+                for r in batch
+                for user_id, won, word_count, letter_count, longest_word in r.players
+            ],
+            columns=["user_id", "group_id", "game_id", "won", "word_count", "letter_count", "longest_word"],
+        )
+
+        await self.write_rollups(conn, batch)
+        await self.write_group_stats(conn, batch)
+
+    async def write_rollups(self, conn: asyncpg.Connection, batch: List[GameResult]) -> None:
+        # Daily counts for /trends, days are the dates games started on
+        game_modes = Counter((r.start_time.date(), r.game_mode) for r in batch)
+        await conn.execute(
+            """\
+            INSERT INTO daily_game_mode (day, game_mode, game_count)
+                SELECT * FROM unnest($1::DATE[], $2::TEXT[], $3::INTEGER[])
+            ON CONFLICT (day, game_mode) DO UPDATE
+            SET game_count = daily_game_mode.game_count + excluded.game_count;""",
+            [day for day, _ in game_modes],
+            [game_mode for _, game_mode in game_modes],
+            list(game_modes.values()),
+        )
+
+        games = Counter(r.start_time.date() for r in batch)
+        active_groups = {(r.start_time.date(), r.group_id) for r in batch}
+        active_players = {(r.start_time.date(), p[0]) for r in batch for p in r.players}
+        first_groups: Dict[int, date] = {}
+        for day, group_id in sorted(active_groups):
+            first_groups.setdefault(group_id, day)
+        first_players: Dict[int, date] = {}
+        for day, user_id in sorted(active_players):
+            first_players.setdefault(user_id, day)
+
+        # Groups and players are only counted on days they were not seen on before, according to rows inserted
+        await conn.execute(
+            """\
+            WITH games AS (
+                SELECT * FROM unnest($1::DATE[], $2::INTEGER[]) AS t (day, game_count)
+            ), active_groups AS (
+                INSERT INTO daily_group (day, group_id)
+                    SELECT * FROM unnest($3::DATE[], $4::BIGINT[])
+                ON CONFLICT DO NOTHING
+                RETURNING day
+            ), active_players AS (
+                INSERT INTO daily_player (day, user_id)
+                    SELECT * FROM unnest($5::DATE[], $6::BIGINT[])
+                ON CONFLICT DO NOTHING
+                RETURNING day
+            ), new_groups AS (
+                INSERT INTO first_group (group_id, day)
+                    SELECT * FROM unnest($7::BIGINT[], $8::DATE[])
+                ON CONFLICT DO NOTHING
+                RETURNING day
+            ), new_players AS (
+                INSERT INTO first_player (user_id, day)
+                    SELECT * FROM unnest($9::BIGINT[], $10::DATE[])
+                ON CONFLICT DO NOTHING
+                RETURNING day
+            )
+            INSERT INTO daily_stats (day, game_count, active_groups, active_players, new_groups, new_players)
+                SELECT day, SUM(game_count), SUM(active_groups), SUM(active_players), SUM(new_groups), SUM(new_players)
+                FROM (
+                    SELECT day, game_count, 0 active_groups, 0 active_players, 0 new_groups, 0 new_players FROM games
+                    UNION ALL SELECT day, 0, 1, 0, 0, 0 FROM active_groups
+                    UNION ALL SELECT day, 0, 0, 1, 0, 0 FROM active_players
+                    UNION ALL SELECT day, 0, 0, 0, 1, 0 FROM new_groups
+                    UNION ALL SELECT day, 0, 0, 0, 0, 1 FROM new_players
+                ) c
+                GROUP BY day
+            ON CONFLICT (day) DO UPDATE
+            SET game_count = daily_stats.game_count + excluded.game_count,
+                active_groups = daily_stats.active_groups + excluded.active_groups,
+                active_players = daily_stats.active_players + excluded.active_players,
+                new_groups = daily_stats.new_groups + excluded.new_groups,
+                new_players = daily_stats.new_players + excluded.new_players;""",
+            list(games),
+            list(games.values()),
+            [day for day, _ in active_groups],
+            [group_id for _, group_id in active_groups],
+            [day for day, _ in active_players],
+            [user_id for _, user_id in active_players],
+            list(first_groups),
+            list(first_groups.values()),
+            list(first_players),
+            list(first_players.values()),
+        )
+
+    async def write_group_stats(self, conn: asyncpg.Connection, batch: List[GameResult]) -> None:
+        # Per group totals of each player, and totals of each group
+        members: Dict[Tuple[int, int], List[int]] = {}  # Group and user id mapped to game, win, word and letter count
+        groups: Dict[int, List[int]] = {}  # Group id mapped to game, word and letter count
+        for r in batch:
+            group_totals = groups.setdefault(r.group_id, [0, 0, 0])
+            group_totals[0] += 1
+            for user_id, won, word_count, letter_count, _ in r.players:
+                totals = members.setdefault((r.group_id, user_id), [0, 0, 0, 0])
+                totals[0] += 1
+                totals[1] += won
+                totals[2] += word_count
+                totals[3] += letter_count
+                group_totals[1] += word_count
+                group_totals[2] += letter_count
+
+        # Players are counted once per group, when their group_player row is inserted instead of updated
+        await conn.execute(
+            """\
+            WITH members AS (
+                INSERT INTO group_player (group_id, user_id, game_count, win_count, word_count, letter_count)
+                    SELECT * FROM unnest(
+                        $1::BIGINT[], $2::BIGINT[], $3::INTEGER[], $4::INTEGER[], $5::INTEGER[], $6::INTEGER[]
+                    )
+                ON CONFLICT (group_id, user_id) DO UPDATE
+                SET game_count = group_player.game_count + excluded.game_count,
+                    win_count = group_player.win_count + excluded.win_count,
+                    word_count = group_player.word_count + excluded.word_count,
+                    letter_count = group_player.letter_count + excluded.letter_count
+                RETURNING group_id, xmax = 0 AS inserted
+            ), new_players AS (
+                SELECT group_id, COUNT(*) FILTER (WHERE inserted) player_count
+                    FROM members
+                    GROUP BY group_id
+            )
+            INSERT INTO group_stats (group_id, player_count, game_count, word_count, letter_count)
+                SELECT g.group_id, COALESCE(new_players.player_count, 0), g.game_count, g.word_count, g.letter_count
+                FROM unnest($7::BIGINT[], $8::INTEGER[], $9::BIGINT[], $10::BIGINT[])
+                    AS g (group_id, game_count, word_count, letter_count)
+                LEFT JOIN new_players ON new_players.group_id = g.group_id
+            ON CONFLICT (group_id) DO UPDATE
+            SET player_count = group_stats.player_count + excluded.player_count,
+                game_count = group_stats.game_count + excluded.game_count,
+                word_count = group_stats.word_count + excluded.word_count,
+                letter_count = group_stats.letter_count + excluded.letter_count;""",
+            [group_id for group_id, _ in members],
+            [user_id for _, user_id in members],
+            *([totals[i] for totals in members.values()] for i in range(4)),
+            list(groups),
+            *([totals[i] for totals in groups.values()] for i in range(3)),
+        )
+
+
+async def migrate_stats(conn: asyncpg.Connection, old_group_id: int, new_group_id: int) -> None:
+    # Merge daily rollups and group statistics of a group into those of the supergroup it was upgraded to
+    # Counts of days both ids were active on, and of the later of their first days, are corrected
+    # Tables are modified in the same order as when results are written
+    await conn.execute(
+        """\
+        WITH old_days AS (
+            DELETE FROM daily_group WHERE group_id = $2 RETURNING day
+        ), moved_days AS (
+            INSERT INTO daily_group (day, group_id)
+                SELECT day, $1::BIGINT FROM old_days
+            ON CONFLICT DO NOTHING
+            RETURNING day
+        ), first_days AS (
+            SELECT day FROM first_group WHERE group_id = $1
+        ), old_first_day AS (
+            DELETE FROM first_group WHERE group_id = $2 RETURNING day
+        ), first_day AS (
+            INSERT INTO first_group (group_id, day)
+                SELECT $1::BIGINT, day FROM old_first_day
+            ON CONFLICT (group_id) DO UPDATE
+            SET day = LEAST(first_group.day, excluded.day)
+        )
+        UPDATE daily_stats
+        SET active_groups = daily_stats.active_groups - corrections.active_groups,
+            new_groups = daily_stats.new_groups - corrections.new_groups
+        FROM (
+            SELECT day, SUM(active_groups) active_groups, SUM(new_groups) new_groups
+            FROM (
+                SELECT day, 1 active_groups, 0 new_groups
+                    FROM (SELECT day FROM old_days EXCEPT SELECT day FROM moved_days) d
+                UNION ALL SELECT GREATEST(old_first_day.day, first_days.day), 0, 1 FROM old_first_day, first_days
+            ) c
+            GROUP BY day
+        ) corrections
+        WHERE daily_stats.day = corrections.day;""",
+        new_group_id,
+        old_group_id,
+    )
+
+    # Players of both ids are counted once
+    await conn.execute(
+        """\
+        WITH old_members AS (
+            DELETE FROM group_player WHERE group_id = $2 RETURNING *
+        ), members AS (
+            INSERT INTO group_player (group_id, user_id, game_count, win_count, word_count, letter_count)
+                SELECT $1::BIGINT, user_id, game_count, win_count, word_count, letter_count FROM old_members
+            ON CONFLICT (group_id, user_id) DO UPDATE
+            SET game_count = group_player.game_count + excluded.game_count,
+                win_count = group_player.win_count + excluded.win_count,
+                word_count = group_player.word_count + excluded.word_count,
+                letter_count = group_player.letter_count + excluded.letter_count
+            RETURNING xmax = 0 AS inserted
+        ), old_stats AS (
+            DELETE FROM group_stats WHERE group_id = $2 RETURNING *
+        )
+        INSERT INTO group_stats (group_id, player_count, game_count, word_count, letter_count)
+            SELECT $1::BIGINT, (SELECT COUNT(*) FILTER (WHERE inserted) FROM members), game_count, word_count,
+                   letter_count
+            FROM old_stats
+        ON CONFLICT (group_id) DO UPDATE
+        SET player_count = group_stats.player_count + excluded.player_count,
+            game_count = group_stats.game_count + excluded.game_count,
+            word_count = group_stats.word_count + excluded.word_count,
+            letter_count = group_stats.letter_count + excluded.letter_count;""",
+        new_group_id,
+        old_group_id,
+    )
+
+
+async def backfill_stats() -> None:
+    # Rebuild daily rollups and group statistics from every game written so far
+    # Results are not written meanwhile, so that they are counted exactly once and the writer cannot deadlock with
+    # the table locks. The tables are still locked, in the order results are written, against group migrations.
+    async with result_writer.lock, pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                """\
+                LOCK TABLE daily_game_mode, daily_group, daily_player, first_group, first_player, daily_stats,
+                           group_player, group_stats
+                    IN EXCLUSIVE MODE;
+                TRUNCATE daily_stats, daily_game_mode, daily_group, daily_player, first_group, first_player,
+                         group_stats, group_player;
+                INSERT INTO daily_game_mode (day, game_mode, game_count)
+                    SELECT start_time::DATE, game_mode, COUNT(*)
+                    FROM game
+                    GROUP BY 1, 2;
+                INSERT INTO daily_group (day, group_id)
+                    SELECT DISTINCT start_time::DATE, group_id
+                    FROM game;
+                INSERT INTO daily_player (day, user_id)
+                    SELECT DISTINCT game.start_time::DATE, gameplayer.user_id
+                    FROM gameplayer
+                    INNER JOIN game ON gameplayer.game_id = game.id;
+                INSERT INTO first_group (group_id, day)
+                    SELECT group_id, MIN(day)
+                    FROM daily_group
+                    GROUP BY group_id;
+                INSERT INTO first_player (user_id, day)
+                    SELECT user_id, MIN(day)
+                    FROM daily_player
+                    GROUP BY user_id;
+                INSERT INTO daily_stats (day, game_count, active_groups, active_players, new_groups, new_players)
+                    SELECT day, SUM(game_count), SUM(active_groups), SUM(active_players), SUM(new_groups),
+                           SUM(new_players)
+                    FROM (
+                        SELECT day, game_count, 0 active_groups, 0 active_players, 0 new_groups, 0 new_players
+                            FROM daily_game_mode
+                        UNION ALL SELECT day, 0, 1, 0, 0, 0 FROM daily_group
+                        UNION ALL SELECT day, 0, 0, 1, 0, 0 FROM daily_player
+                        UNION ALL SELECT day, 0, 0, 0, 1, 0 FROM first_group
+                        UNION ALL SELECT day, 0, 0, 0, 0, 1 FROM first_player
+                    ) c
+                    GROUP BY day;
+                INSERT INTO group_player (group_id, user_id, game_count, win_count, word_count, letter_count)
+                    SELECT group_id, user_id, COUNT(*), COUNT(*) FILTER (WHERE won), SUM(word_count), SUM(letter_count)
+                    FROM gameplayer
+                    GROUP BY group_id, user_id;
+                INSERT INTO group_stats (group_id, player_count, game_count, word_count, letter_count)
+                    SELECT group_id, COUNT(DISTINCT user_id), COUNT(DISTINCT game_id), SUM(word_count),
+                           SUM(letter_count)
+                    FROM gameplayer
+                    GROUP BY group_id;"""
+            )
+
+
+result_writer = ResultWriter()
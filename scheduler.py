@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ("when", "tick", "callback", "args", "slot")
+
+    def __init__(self, when: float, tick: int, callback: Callable[..., Any], args: tuple) -> None:
+        self.when = when  # Event loop time at which the callback is due
+        self.tick = tick  # First tick not earlier than when
+        self.callback = callback
+        self.args = args
+        self.slot: Optional[Dict["Timer", None]] = None  # Wheel slot currently holding the timer
+
+    @property
+    def pending(self) -> bool:
+        # False once the timer has fired or been cancelled
+        return self.slot is not None
+
+    def cancel(self) -> None:
+        if self.slot is not None:
+            del self.slot[self]
+            self.slot = None
+
+
+class TimerWheel:
+    # Hierarchical timing wheel driving every game timer with a single event loop callback
+    # Slots of level n span SLOTS ** n ticks, timers due far away are cascaded to lower levels as their time nears
+    # The event loop is only woken up at ticks where a slot is due, so wakeups scale with timers instead of games
+    # Ticks are short so that timers fire right at their deadlines
+
+    SLOTS = 64
+    LEVELS = 4  # 64 ** 4 ticks of 10ms cover about 2 days, later timers are cascaded again at the top level
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, resolution: float = 0.01) -> None:
+        self.loop = loop
+        self.resolution = resolution  # Seconds per tick
+        self.start = loop.time()
+        self.tick = 0  # Last processed tick
+        # Slots are insertion-ordered dicts used as sets for O(1) cancellation
+        self.wheels: List[List[Dict[Timer, None]]] = [
+            [{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.handle_tick: Optional[int] = None  # Tick the event loop callback is armed for
+        self.timer_count = 0
+        self.wakeups = 0
+
+    def __len__(self) -> int:
+        return sum(len(slot) for wheel in self.wheels for slot in wheel)
+
+    def time_of(self, tick: int) -> float:
+        return self.start + tick * self.resolution
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        return self.call_at(self.loop.time() + delay, callback, *args)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        # Timers are rounded up to the next tick so they never fire early
+        tick = max(math.ceil((when - self.start) / self.resolution), self.tick + 1)
+        timer = Timer(when, tick, callback, args)
+        self.insert(timer)
+        self.timer_count += 1
+        if self.handle_tick is None or tick < self.handle_tick:
+            self.arm(tick)
+        return timer
+
+    def insert(self, timer: Timer) -> None:
+        diff = timer.tick - self.tick
+        level = 0
+        while level < self.LEVELS - 1 and diff >= self.SLOTS ** (level + 1):
+            level += 1
+        # Timers beyond the top level are placed in its furthest slot and placed again when cascaded
+        tick = min(timer.tick, self.tick + self.SLOTS ** self.LEVELS - 1)
+        slot = self.wheels[level][tick // self.SLOTS ** level % self.SLOTS]
+        slot[timer] = None
+        timer.slot = slot
+
+    def next_tick(self) -> Optional[int]:
+        # Earliest tick at which a non-empty slot is fired or cascaded
+        best = None
+        for level, wheel in enumerate(self.wheels):
+            span = self.SLOTS ** level
+            block = self.tick // span + 1
+            for i, slot in enumerate(wheel):
+                if slot:
+                    tick = (block + (i - block) % self.SLOTS) * span
+                    if best is None or tick < best:
+                        best = tick
+        return best
+
+    def arm(self, tick: Optional[int]) -> None:
+        if self.handle:
+            self.handle.cancel()
+        self.handle_tick = tick
+        self.handle = None if tick is None else self.loop.call_at(self.time_of(tick), self.run)
+
+    def advance(self, tick: int) -> None:
+        # Nothing is due between the last processed tick and this tick
+        self.tick = tick
+
+        # Cascade timers of higher level slots starting at this tick into lower levels
+        for level in range(1, self.LEVELS):
+            span = self.SLOTS ** level
+            if tick % span:
+                break
+            slot = self.wheels[level][tick // span % self.SLOTS]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self.insert(timer)
+
+        slot = self.wheels[0][tick % self.SLOTS]
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            timer.slot = None
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception("Error in timer callback")
+
+    def run(self) -> None:
+        self.wakeups += 1
+        self.handle = self.handle_tick = None
+        # Catch up on every due tick in case the event loop was busy
+        # The event loop may run callbacks slightly early within its clock resolution
+        now = math.floor((self.loop.time() - self.start) / self.resolution + 1e-3)
+        tick = self.next_tick()
+        while tick is not None and tick <= now:
+            self.advance(tick)
+            tick = self.next_tick()
+        self.arm(tick)
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot, types
+from aiogram.utils.exceptions import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class Priority:
+    # Lower values are sent first
+    TURN = 0  # Turn prompts
+    GAME = 1  # Other game messages
+    ANNOUNCEMENT = 2  # Join announcements and reminders
+    ADMIN = 3  # Admin group messages
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate  # Tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self.refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+    def take(self, now: float) -> None:
+        self.refill(now)
+        self.tokens -= 1
+
+
+class Request:
+    __slots__ = ("priority", "seq", "func", "args", "kwargs", "future")
+
+    def __init__(
+        self, priority: int, seq: int, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: Dict[str, Any]
+    ) -> None:
+        self.priority = priority
+        self.seq = seq  # Requests of the same priority are sent in submission order
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: asyncio.Future = asyncio.get_event_loop().create_future()
+
+    def __lt__(self, other: "Request") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Chat:
+    def __init__(self, chat_id: int, bucket: TokenBucket) -> None:
+        self.chat_id = chat_id
+        self.bucket = bucket
+        self.queue: List[Request] = []  # Heap of pending requests
+        self.blocked_until = 0.0  # Set by flood waits
+        self.waiting = False  # Whether chat is waiting for its bucket to refill
+        self.in_flight = 0
+
+    @property
+    def idle(self) -> bool:
+        return not self.queue and not self.waiting and not self.in_flight
+
+    def wait_time(self, now: float) -> float:
+        return max(self.bucket.wait_time(now), self.blocked_until - now)
+
+
+class Sender:
+    # Sends every outgoing Bot API request within Telegram's rate limits
+    # Requests are sent in priority order across all chats, limited by a global token bucket and one per chat,
+    # and flood waits only delay the affected chat's requests, which are retried automatically
+
+    GLOBAL_RATE = 30  # Messages per second across all chats
+    GROUP_RATE = 20 / 60  # Messages per second in a group
+    GROUP_BURST = 3
+    PRIVATE_RATE = 1  # Messages per second in a private chat
+    PRIVATE_BURST = 1
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, bot: Bot) -> None:
+        self.loop = loop
+        self.bot = bot
+        self.bucket = TokenBucket(self.GLOBAL_RATE, self.GLOBAL_RATE, loop.time())
+        self.chats: Dict[int, Chat] = {}
+        self.ready: List[Tuple[int, int, int]] = []  # Heap of (priority, seq, chat id) of sendable chat heads
+        self.waiting: List[Tuple[float, int]] = []  # Heap of (time, chat id) of chats waiting for their bucket
+        self.seq = count()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retries = 0
+
+    def __len__(self) -> int:
+        return sum(len(chat.queue) for chat in self.chats.values())
+
+    def get_chat(self, chat_id: int) -> Chat:
+        chat = self.chats.get(chat_id)
+        if not chat:
+            if chat_id < 0:
+                bucket = TokenBucket(self.GROUP_RATE, self.GROUP_BURST, self.loop.time())
+            else:
+                bucket = TokenBucket(self.PRIVATE_RATE, self.PRIVATE_BURST, self.loop.time())
+            chat = self.chats[chat_id] = Chat(chat_id, bucket)
+        return chat
+
+    def schedule(self, chat: Chat) -> None:
+        # Make chat's first request available to the dispatcher
+        if chat.queue and not chat.waiting:
+            heappush(self.ready, (chat.queue[0].priority, chat.queue[0].seq, chat.chat_id))
+            self.wakeup.set()
+
+    def prune(self, now: float) -> None:
+        # Forget idle chats whose buckets have refilled, they would be recreated in the same state
+        for chat_id in [
+            chat_id for chat_id, chat in self.chats.items()
+            if chat.idle and chat.blocked_until <= now and chat.bucket.full(now)
+        ]:
+            del self.chats[chat_id]
+
+    def enqueue(
+        self, chat_id: int, priority: int, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> asyncio.Future:
+        # Queue func(*args, **kwargs) to be called once chat_id may receive a message without waiting for it
+        # Returns a future of its result, cancelling the future drops the request if it has not been sent yet
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+        chat = self.get_chat(chat_id)
+        request = Request(priority, next(self.seq), func, args, kwargs)
+        heappush(chat.queue, request)
+        if chat.queue[0] is request:
+            self.schedule(chat)
+        return request.future
+
+    async def submit(
+        self, chat_id: int, priority: int, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        # Call func(*args, **kwargs) once chat_id may receive a message, returning its result
+        return await self.enqueue(chat_id, priority, func, *args, **kwargs)
+
+    def enqueue_message(
+        self, chat_id: int, text: str, priority: int = Priority.GAME, **kwargs: Any
+    ) -> asyncio.Future:
+        return self.enqueue(chat_id, priority, self.bot.send_message, chat_id, text, **kwargs)
+
+    async def send_message(
+        self, chat_id: int, text: str, priority: int = Priority.GAME, **kwargs: Any
+    ) -> types.Message:
+        return await self.enqueue_message(chat_id, text, priority, **kwargs)
+
+    async def run(self) -> None:
+        while True:
+            now = self.loop.time()
+            while self.waiting and self.waiting[0][0] <= now:
+                chat = self.chats[heappop(self.waiting)[1]]
+                chat.waiting = False
+                self.schedule(chat)
+
+            if not self.ready:
+                self.prune(now)
+                self.wakeup.clear()
+                timeout = self.waiting[0][0] - now if self.waiting else None
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            wait = self.bucket.wait_time(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            priority, seq, chat_id = heappop(self.ready)
+            chat = self.chats.get(chat_id)
+            if not chat or chat.waiting or not chat.queue:
+                continue
+            if (chat.queue[0].priority, chat.queue[0].seq) != (priority, seq):
+                continue  # Outdated entry, chat was scheduled again with a higher priority request
+
+            wait = chat.wait_time(now)
+            if wait > 0:
+                chat.waiting = True
+                heappush(self.waiting, (now + wait, chat_id))
+                continue
+
+            request = heappop(chat.queue)
+            if request.future.cancelled():  # Caller no longer waiting, e.g. its game was killed
+                self.schedule(chat)
+                continue
+            self.bucket.take(now)
+            chat.bucket.take(now)
+            chat.in_flight += 1
+            asyncio.create_task(self.execute(chat, request))
+            self.schedule(chat)
+
+    async def execute(self, chat: Chat, request: Request) -> None:
+        try:
+            result = await request.func(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            # Flood wait, block chat and send again afterwards in the same order
+            logger.warning(f"Flood wait of {e.timeout}s in chat {chat.chat_id}")
+            self.retries += 1
+            chat.blocked_until = max(chat.blocked_until, self.loop.time() + e.timeout)
+            heappush(chat.queue, request)
+            if chat.queue[0] is request:
+                self.schedule(chat)
+        except Exception as e:
+            if not request.future.done():  # Caller may have been cancelled
+                request.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not request.future.done():
+                request.future.set_result(result)
+        finally:
+            chat.in_flight -= 1
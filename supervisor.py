@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Dict
+
+from aiogram import types
+from aiogram.utils.exceptions import MigrateToChat
+
+from constants import GAMES, loop, sender
+from game import ClassicGame
+from sender import Priority
+from utils import migrate_group, send_admin_group
+
+logger = logging.getLogger(__name__)
+
+
+class GameSupervisor:
+    # Runs every game in its own detached task so that the handler starting a game returns immediately
+    # Failures are handled per game instead of through the dispatcher's error handler
+
+    def __init__(self) -> None:
+        self.tasks: Dict[ClassicGame, asyncio.Task] = {}  # Registry of running games
+        self.started = 0
+        self.finished = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def start(self, game: ClassicGame, message: types.Message) -> None:
+        task = asyncio.create_task(self.run(game, message))
+        if hasattr(task, "set_name"):  # Python 3.8+
+            task.set_name(f"{game.__class__.__name__}:{game.group_id}")
+        self.tasks[game] = task
+        self.started += 1
+
+    async def run(self, game: ClassicGame, message: types.Message) -> None:
+        try:
+            await game.main_loop(message)
+        except asyncio.CancelledError:
+            raise
+        except MigrateToChat as e:
+            # Games move themselves when their queued messages fail this way,
+            # this covers requests the game waited for directly, after which the game cannot continue
+            self.finished += 1
+            old_group_id = game.group_id
+            try:
+                await migrate_group(old_group_id, e.migrate_to_chat_id)
+                await sender.send_message(
+                    e.migrate_to_chat_id, "This group was upgraded to a supergroup. The game has ended.", Priority.GAME
+                )
+            except Exception:
+                logger.exception(f"Failed to migrate group {old_group_id} to {e.migrate_to_chat_id}")
+        except Exception as e:
+            self.failed += 1
+            logger.exception(f"Game in group {game.group_id} failed")
+            try:
+                await send_admin_group(f"`{e.__class__.__name__} @ {game.group_id}`:\n`{str(e)}`")
+            except Exception:
+                pass
+        else:
+            self.finished += 1
+        finally:
+            # Main loop removes the game on exit, this covers cancellation and games replaced by migration
+            game.cancel_all_timers()
+            if GAMES.get(game.group_id) is game:
+                del GAMES[game.group_id]
+            del self.tasks[game]
+
+    def idle_games(self, seconds: float) -> int:
+        # Number of games without any event handled for the given duration
+        now = loop.time()
+        return sum(now - game.last_activity >= seconds for game in self.tasks)
+
+
+supervisor = GameSupervisor()
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.utils.exceptions import TelegramAPIError
+
+from constants import GAMES
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateClass:
+    # Classes of updates, each processed by its own pool of workers
+    ANSWER = "answer"  # Messages in groups with a game
+    GAME = "game"  # Game commands
+    ADMIN = "admin"  # Payments and owner commands, rare but must not be lost
+    COMMAND = "command"  # Other commands and messages
+    INLINE = "inline"
+    STATS = "stats"  # Commands running database queries
+
+
+GAME_COMMANDS = {
+    "startclassic", "startgame", "starthard", "startchaos", "startcfl", "startbl", "startrl", "startelim",
+    "startmelim", "join", "forcejoin", "extend", "forcestart", "flee", "forceflee", "killgame", "killgaym",
+    "forceskip", "addvp", "remvp", "incmaxp",
+}
+STATS_COMMANDS = {"stat", "stats", "stalk", "groupstats", "globalstats", "trend", "trends", "playinggroups"}
+ADMIN_COMMANDS = {
+    "donate", "runinfo", "sql", "addword", "addwords", "rejword", "updatewords", "backfillstats", "maintmode", "leave",
+}
+
+
+class Pool:
+    def __init__(self, workers: int, queue_size: int, shed: bool) -> None:
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.shed = shed  # Whether updates are dropped instead of waited for under overload
+        self.workers: List[asyncio.Task] = []
+        self.processed = 0
+        self.dropped = 0
+
+    @property
+    def backlogged(self) -> bool:
+        return self.queue.qsize() >= self.queue.maxsize // 2
+
+
+class UpdatePools:
+    # Processes updates with a bounded pool of workers per update class
+    # so that game answers and commands never wait behind database queries or inline queries
+    # Under overload, classes allowed to shed drop new updates, and they do so as soon as any other class is backlogged
+    # Other classes make the update source wait for queue space instead
+
+    # Update class mapped to share of workers, queue size and whether to shed
+    POOLS = {
+        UpdateClass.ANSWER: (0.3, 1000, False),
+        UpdateClass.GAME: (0.2, 500, False),
+        UpdateClass.ADMIN: (0.1, 100, False),
+        UpdateClass.COMMAND: (0.2, 200, True),
+        UpdateClass.INLINE: (0.1, 100, True),
+        UpdateClass.STATS: (0.1, 20, True),
+    }
+
+    def __init__(self, dp: Dispatcher, workers: int) -> None:
+        self.dp = dp
+        self.pools: Dict[str, Pool] = {
+            update_class: Pool(max(1, round(workers * share)), queue_size, shed)
+            for update_class, (share, queue_size, shed) in self.POOLS.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(pool.queue.qsize() for pool in self.pools.values())
+
+    @property
+    def dropped(self) -> int:
+        return sum(pool.dropped for pool in self.pools.values())
+
+    @staticmethod
+    def classify(update: types.Update) -> str:
+        if update.inline_query or update.chosen_inline_result:
+            return UpdateClass.INLINE
+        if update.pre_checkout_query or update.callback_query:
+            return UpdateClass.ADMIN
+
+        message = update.message or update.edited_message
+        if not message:
+            return UpdateClass.COMMAND
+        if message.successful_payment:
+            return UpdateClass.ADMIN
+        if message.text and message.text.startswith("/"):
+            command = message.text.split(maxsplit=1)[0][1:].partition("@")[0].lower()
+            if command in GAME_COMMANDS:
+                return UpdateClass.GAME
+            if command in STATS_COMMANDS:
+                return UpdateClass.STATS
+            if command in ADMIN_COMMANDS:
+                return UpdateClass.ADMIN
+            return UpdateClass.COMMAND
+        if message.chat.id in GAMES:
+            return UpdateClass.ANSWER
+        return UpdateClass.COMMAND
+
+    async def submit(self, update: types.Update) -> None:
+        pool = self.pools[self.classify(update)]
+        if pool.shed and (
+            pool.queue.full() or any(p.backlogged for p in self.pools.values() if not p.shed)
+        ):
+            pool.dropped += 1
+            return
+        await pool.queue.put(update)
+
+    async def worker(self, pool: Pool) -> None:
+        while True:
+            update = await pool.queue.get()
+            try:
+                await self.dp.process_update(update)
+            except Exception:
+                # Errors handlers have been run already
+                logger.exception(f"Error processing update {update.update_id}")
+            finally:
+                pool.processed += 1
+                pool.queue.task_done()
+
+    def start(self) -> None:
+        # Handlers rely on the current bot being set, tasks created afterwards inherit it
+        Bot.set_current(self.dp.bot)
+        Dispatcher.set_current(self.dp)
+        for pool in self.pools.values():
+            pool.workers = [asyncio.create_task(self.worker(pool)) for _ in range(pool.worker_count)]
+
+    async def stop(self) -> None:
+        # Finish queued updates before stopping workers
+        for pool in self.pools.values():
+            await pool.queue.join()
+        for pool in self.pools.values():
+            for task in pool.workers:
+                task.cancel()
+            await asyncio.gather(*pool.workers, return_exceptions=True)
+
+    async def poll(self) -> None:
+        # Long polling without waiting for updates to be processed before fetching more
+        self.start()
+        bot = self.dp.bot
+        await bot.delete_webhook()
+        offset: Optional[int] = None
+        updates = await bot.get_updates(offset=-1, timeout=1)  # Skip pending updates
+        if updates:
+            offset = updates[-1].update_id + 1
+        logger.info("Polling for updates")
+
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=20)
+            except (TelegramAPIError, asyncio.TimeoutError):
+                logger.exception("Failed to get updates")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                await self.submit(update)
+
+    def run_polling(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.run_until_complete(self.poll())
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.run_until_complete(self.stop())
+            loop.run_until_complete(self.dp.bot.close())
@@ -1,57 +1,66 @@
-import random
-from typing import List, Set, Any, Optional
+import asyncio
+from typing import List, Any, Optional, Tuple, Iterator
 
 from aiogram import types
 
-from constants import bot, on9bot, pool, ADMIN_GROUP_ID, VIP, get_words_all, get_words_set, get_words_li
+from constants import GAMES, on9bot, pool, sender, ADMIN_GROUP_ID, VIP, get_dictionary
+from results import migrate_stats, result_writer
+from sender import Priority
+from words import UsedWords
 
 
 def check_word_existence(word: str) -> bool:
-    return word in get_words_set()[word[0]]
+    return word in get_dictionary()
 
 
 def filter_words(
     min_len: int = 1,
     starting_letter: Optional[str] = None,
-    banned_letters: Optional[List[int]] = None,
+    banned_letters: Optional[List[str]] = None,
     required_letter: Optional[str] = None,
-    exclude_words: Optional[Set[str]] = None,
+    exclude_words: Optional[UsedWords] = None,
 ) -> List[str]:
-    if starting_letter:
-        words = get_words_li()[starting_letter]
-    else:
-        words = get_words_all()
-
-    def f(word):  # Filter
-        if len(word) < min_len:
-            return False
-        if banned_letters and any(i in word for i in banned_letters):
-            return False
-        if required_letter and required_letter not in word:
-            return False
-        if exclude_words and word in exclude_words:
-            return False
-        return True
-
-    return [w for w in words if f(w)]
+    return get_dictionary().filter_words(min_len, starting_letter, banned_letters, required_letter, exclude_words)
 
 
 def get_random_word(
     min_len: int = 1,
     starting_letter: Optional[str] = None,
-    banned_letters: Optional[List[int]] = None,
+    banned_letters: Optional[List[str]] = None,
     required_letter: Optional[str] = None,
-    exclude_words: Optional[Set[str]] = None,
+    exclude_words: Optional[UsedWords] = None,
 ) -> Optional[str]:
-    words = filter_words(min_len, starting_letter, banned_letters, required_letter, exclude_words)
-    if words:
-        return random.choice(words)
-    else:
-        return None
+    return get_dictionary().random_word(min_len, starting_letter, banned_letters, required_letter, exclude_words)
+
+
+def search_prefix(prefix: str, offset: int = 0) -> Tuple[Iterator[str], int]:
+    return get_dictionary().search_prefix(prefix, offset)
+
+
+async def send_admin_group(text: str, **kwargs: Any) -> types.Message:
+    return await sender.send_message(ADMIN_GROUP_ID, text, Priority.ADMIN, disable_web_page_preview=True, **kwargs)
+
 
+async def migrate_group(old_group_id: int, new_group_id: int) -> None:
+    # Move the group's game and records to the supergroup it was upgraded to
+    # Called for any request failing with MigrateToChat, so it must be safe to run more than once
+    if old_group_id in GAMES:
+        GAMES[new_group_id] = GAMES.pop(old_group_id)
+        GAMES[new_group_id].group_id = new_group_id
+        asyncio.create_task(send_admin_group(f"Game moved from {old_group_id} to {new_group_id}."))
 
-async def send_admin_group(*args: Any, **kwargs: Any) -> types.Message:
-    return await bot.send_message(ADMIN_GROUP_ID, *args, disable_web_page_preview=True, **kwargs)
+    # Results are not written meanwhile, so a batch of the old group cannot commit after the migration
+    # Batches failing before the lock is released are queued again in time to be re-keyed
+    async with result_writer.lock:
+        result_writer.migrate(old_group_id, new_group_id)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("UPDATE game SET group_id = $1 WHERE group_id = $2;", new_group_id, old_group_id)
+                await conn.execute(
+                    "UPDATE gameplayer SET group_id = $1 WHERE group_id = $2;", new_group_id, old_group_id
+                )
+                await migrate_stats(conn, old_group_id, new_group_id)
+    await send_admin_group(f"Group migrated to {new_group_id}.")
 
 
 async def amt_donated(user_id: int) -> int:
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+from aiogram import types
+from aiohttp import web
+
+from updates import UpdatePools
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    # Receives updates pushed by Telegram on a local port, meant to run behind a reverse proxy terminating TLS
+    # Updates are acknowledged as soon as they are queued in the update pools, so a slow handler neither delays
+    # other updates nor makes Telegram resend its update
+
+    MAX_CONNECTIONS = 100  # Concurrent connections Telegram may open to deliver updates, at most 100
+
+    def __init__(self, pools: UpdatePools, url: str) -> None:
+        self.pools = pools
+        self.bot = pools.dp.bot
+        self.url = url
+        self.path = urlparse(url).path or "/"  # Use a hard to guess path as Telegram does not authenticate itself
+        self.runner: Optional[web.AppRunner] = None
+        self.received = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        # Waits for queue space if the update's pool is full, holding back further deliveries
+        await self.pools.submit(types.Update.to_object(await request.json()))
+        self.received += 1
+        return web.Response()
+
+    async def start(self, host: str, port: int) -> None:
+        self.pools.start()
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info(f"Listening for updates on {host}:{port}{self.path}")
+
+        # Same as skipping updates when polling
+        await self.bot.set_webhook(self.url, max_connections=self.MAX_CONNECTIONS, drop_pending_updates=True)
+
+    async def stop(self) -> None:
+        # Stop accepting updates and finish queued ones
+        await self.runner.cleanup()
+        await self.pools.stop()
+        await self.bot.close()
+
+    def run(self, loop: asyncio.AbstractEventLoop, host: str, port: int) -> None:
+        loop.run_until_complete(self.start(host, port))
+        try:
+            loop.run_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.run_until_complete(self.stop())
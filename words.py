@@ -0,0 +1,482 @@
+import copy
+import os
+import random
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from itertools import accumulate, cycle
+from operator import mul
+from string import ascii_lowercase
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+
+def letter_mask(letters: Iterable[str]) -> int:
+    # Bit i is set if the (i + 1)-th letter of the alphabet is present
+    mask = 0
+    for c in letters:
+        if "a" <= c <= "z":
+            mask |= 1 << (ord(c) - 97)
+    return mask
+
+
+def check_letters(word: str, banned_letters: Optional[List[str]] = None, required_letter: Optional[str] = None) -> bool:
+    # Single word version of WordIndex.filter
+    mask = letter_mask(word)
+    if banned_letters and mask & letter_mask(banned_letters):
+        return False
+    if required_letter and not mask & letter_mask(required_letter):
+        return False
+    return True
+
+
+def prefix_range(words: Sequence, prefix: str) -> Tuple[int, int]:
+    # Range of words starting with prefix in a sorted sequence of words
+    return bisect_left(words, prefix), bisect_left(words, prefix + "\U0010ffff")
+
+
+# Polynomial hash of a word's bytes (sum of byte * HASH_BASE ** (position % 256) modulo 2 ** 64)
+# Computed with NumPy for every word at once and in Python for single words
+HASH_BASE = 0x100000001B3
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Spreads hashes across buckets
+MASK64 = (1 << 64) - 1
+HASH_POWERS = [pow(HASH_BASE, i, 1 << 64) for i in range(256)]
+HASH_POWERS_NP = np.array(HASH_POWERS, dtype=np.uint64)
+
+
+def word_bucket(word: bytes, bits: int) -> int:
+    h = sum(map(mul, word, cycle(HASH_POWERS))) & MASK64
+    return (h * HASH_MULTIPLIER & MASK64) >> (64 - bits)
+
+
+def remap_ids(ids: np.ndarray, inserted_at: np.ndarray) -> np.ndarray:
+    # Ids after inserting words at the given positions (see WordStore.insert)
+    return ids + np.searchsorted(inserted_at, ids, side="right")
+
+
+class WordStore:
+    # Sorted words packed into one contiguous byte buffer, each word terminated by a newline
+    # Word ids are positions in the sorted order
+
+    def __init__(self, buf: bytes) -> None:
+        # Words must be sorted
+        self.buf = buf
+        chars = np.frombuffer(buf, dtype=np.uint8)
+        ends = np.flatnonzero(chars == 10)
+        # Word i is buf[offsets[i]:offsets[i + 1] - 1]
+        self.offsets = np.concatenate(([0], ends + 1)).astype(np.int32)
+        self.size = len(ends)
+
+        # Hash index for membership: ids of words grouped by hash bucket
+        self.bits = max((self.size - 1).bit_length(), 1)
+        if self.size:
+            positions = np.arange(len(chars)) - np.repeat(self.offsets[:-1], np.diff(self.offsets))
+            values = np.where(chars == 10, 0, chars).astype(np.uint64)
+            hashes = np.add.reduceat(values * HASH_POWERS_NP[positions & 255], self.offsets[:-1])
+        else:
+            hashes = np.zeros(0, dtype=np.uint64)
+        buckets = (hashes * np.uint64(HASH_MULTIPLIER)) >> np.uint64(64 - self.bits)
+        self.table = np.argsort(buckets, kind="stable").astype(np.int32)
+        # Bucket b holds table[table_starts[b]:table_starts[b + 1]]
+        self.table_starts = np.searchsorted(buckets[self.table], np.arange((1 << self.bits) + 1)).astype(np.int32)
+        self.update_views()
+
+    def update_views(self) -> None:
+        # Memoryviews are faster than NumPy arrays at indexing single elements
+        self.offsets_view = memoryview(self.offsets)
+        self.table_view = memoryview(self.table)
+        self.table_starts_view = memoryview(self.table_starts)
+
+    @classmethod
+    def from_words(cls, words: List[str]) -> "WordStore":
+        # words must be sorted
+        return cls("".join(w + "\n" for w in words).encode())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def word(self, i: int) -> str:
+        return self.buf[self.offsets_view[i]:self.offsets_view[i + 1] - 1].decode()
+
+    def words(self, start: int, end: int) -> List[str]:
+        if start >= end:
+            return []
+        return self.buf[self.offsets_view[start]:self.offsets_view[end] - 1].decode().split("\n")
+
+    def find(self, word: str) -> int:
+        # Return id of word, or -1 if word is absent
+        encoded = word.encode()
+        b = word_bucket(encoded, self.bits)
+        for j in range(self.table_starts_view[b], self.table_starts_view[b + 1]):
+            i = self.table_view[j]
+            if self.buf[self.offsets_view[i]:self.offsets_view[i + 1] - 1] == encoded:
+                return i
+        return -1
+
+    def insert(self, words: Iterable[str]) -> Tuple["WordStore", np.ndarray]:
+        # Return a new store with words inserted and the positions (old ids) they were inserted at
+        # The hash index is updated instead of being rebuilt
+        new_words = sorted({w for w in words if self.find(w) == -1})
+        view = WordList(self)
+        inserted_at = np.array([bisect_left(view, w) for w in new_words], dtype=np.int64)
+        if not new_words:
+            return self, inserted_at
+
+        pieces = []
+        prev = 0
+        for w, i in zip(new_words, inserted_at.tolist()):
+            pieces.append(self.buf[self.offsets_view[prev]:self.offsets_view[i]])
+            pieces.append(w.encode() + b"\n")
+            prev = i
+        pieces.append(self.buf[self.offsets_view[prev]:])
+
+        store = copy.copy(self)
+        store.buf = b"".join(pieces)
+        store.offsets = np.concatenate(
+            ([0], np.flatnonzero(np.frombuffer(store.buf, dtype=np.uint8) == 10) + 1)
+        ).astype(np.int32)
+        store.size = self.size + len(new_words)
+        # Append new ids to the end of their hash buckets
+        new_ids = inserted_at + np.arange(len(new_words))
+        buckets = np.array([word_bucket(w.encode(), self.bits) for w in new_words], dtype=np.int64)
+        store.table = np.insert(
+            remap_ids(self.table, inserted_at), self.table_starts[buckets + 1], new_ids
+        ).astype(np.int32)
+        store.table_starts = (
+            self.table_starts + np.searchsorted(np.sort(buckets), np.arange((1 << self.bits) + 1))
+        ).astype(np.int32)
+        store.update_views()
+        return store, inserted_at
+
+
+class WordList(Sequence):
+    # Read-only view of a range of words in a word store, behaving like a sorted list of words
+
+    def __init__(self, store: WordStore, start: int = 0, end: Optional[int] = None) -> None:
+        self.store = store
+        self.start = start
+        self.end = len(store) if end is None else end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            start, end, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, end, step)]
+            return self.store.words(self.start + start, self.start + end)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("word index out of range")
+        return self.store.word(self.start + i)
+
+    def __iter__(self) -> Iterator[str]:
+        # Decode in chunks rather than word by word
+        for i in range(self.start, self.end, 4096):
+            yield from self.store.words(i, min(i + 4096, self.end))
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        return self.start <= self.store.find(word) < self.end
+
+
+def process_words(wordlist: Iterable[str]) -> WordStore:
+    # Remove non-alphabetical words and make every word lowercase
+    wordlist = [w.lower() for w in wordlist if w.isalpha()]
+    # Sort and remove duplicates
+    return WordStore.from_words(sorted(set(wordlist)))
+
+
+# Snapshot of the processed upstream word list so that startup does not depend on the network
+# Format: header line of magic, format version and word count, followed by the word store buffer
+SNAPSHOT_MAGIC = b"ON9WORDS"
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+def save_snapshot(path: str, store: WordStore) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"%s %d %d\n" % (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(store)))
+        f.write(store.buf)
+    os.replace(tmp_path, path)  # Never leave a half-written snapshot behind
+
+
+def load_snapshot(path: str) -> Optional[WordStore]:
+    # Return None if snapshot is missing, outdated or corrupted
+    try:
+        with open(path, "rb") as f:
+            magic, version, word_cnt = f.readline().split()
+            if magic != SNAPSHOT_MAGIC or int(version) != SNAPSHOT_FORMAT_VERSION:
+                return None
+            store = WordStore(f.read())  # Read straight into the store's buffer
+    except (OSError, ValueError):
+        return None
+    if len(store) != int(word_cnt):
+        return None
+    return store
+
+
+class WordIndex:
+    # Word ids bucketed by (first letter, length)
+    # Buckets are laid out contiguously, ordered by first letter then length,
+    # so the words starting with a letter and having at least n letters form a single range
+
+    def __init__(self, store: WordStore) -> None:
+        self.store = store
+        chars = np.frombuffer(store.buf, dtype=np.uint8)
+        starts = store.offsets[:-1]
+        lengths = (np.diff(store.offsets) - 1).astype(np.int32)
+
+        # Per-word letter bitmasks for vectorized filtering (newlines do not set any bit)
+        is_letter = (chars >= 97) & (chars <= 122)
+        shifts = np.where(is_letter, chars, 97).astype(np.uint32) - 97
+        bits = np.where(is_letter, np.left_shift(np.uint32(1), shifts), np.uint32(0))
+        masks = np.bitwise_or.reduceat(bits, starts) if len(store) else np.zeros(0, dtype=np.uint32)
+        first_letters = chars[starts] if len(store) else np.zeros(0, dtype=np.uint8)
+
+        # Stable sort keeps ids ascending (words alphabetical) within each bucket
+        self.ids = np.lexsort((lengths, first_letters)).astype(np.int32)
+        self.lengths = lengths[self.ids]
+        self.masks = masks[self.ids]
+        first_letters = first_letters[self.ids]
+        self.max_len = int(lengths.max()) if len(store) else 0
+
+        # Letter mapped to (lengths present, start of each length's bucket)
+        self.buckets: Dict[str, Tuple[List[int], List[int]]] = {c: ([], []) for c in ascii_lowercase}
+        bucket_starts = np.flatnonzero(np.diff(first_letters.astype(np.int64) << 16 | self.lengths, prepend=-1))
+        for i, c, length in zip(
+            bucket_starts.tolist(), first_letters[bucket_starts].tolist(), self.lengths[bucket_starts].tolist()
+        ):
+            if chr(c) in self.buckets:
+                self.buckets[chr(c)][0].append(length)
+                self.buckets[chr(c)][1].append(i)
+        # Letter mapped to end of the letter's range
+        self.letter_end: Dict[str, int] = {
+            c: int(np.searchsorted(first_letters, ord(c), side="right")) for c in ascii_lowercase
+        }
+        self.update_cumulative()
+
+    def update_cumulative(self) -> None:
+        # Minimum length mapped to per-letter ranges and their cumulative counts,
+        # used to sample from words of any starting letter
+        self.cumulative: Dict[int, Tuple[List[Tuple[int, int]], List[int]]] = {}
+        for min_len in range(1, self.max_len + 1):
+            ranges = [self.get_range(c, min_len) for c in ascii_lowercase]
+            self.cumulative[min_len] = (ranges, list(accumulate(end - start for start, end in ranges)))
+
+    def word(self, i: int) -> str:
+        return self.store.word(int(self.ids[i]))
+
+    def copy(self) -> "WordIndex":
+        # Copy of mutable attributes, NumPy arrays are never modified in place so they are shared
+        index = copy.copy(self)
+        index.buckets = {c: (lengths[:], starts[:]) for c, (lengths, starts) in self.buckets.items()}
+        index.letter_end = self.letter_end.copy()
+        return index
+
+    def insert_words(self, store: WordStore, inserted_at: np.ndarray) -> None:
+        # Insert words added to the store (see WordStore.insert) in place without rebuilding the whole index
+        self.ids = remap_ids(self.ids, inserted_at).astype(np.int32)
+        self.store = store
+        for word_id in (inserted_at + np.arange(len(inserted_at))).tolist():
+            word = store.word(word_id)
+            c = word[0]
+            lengths, starts = self.buckets[c]
+            i = bisect_left(lengths, len(word))
+            if i < len(lengths) and lengths[i] == len(word):
+                # Keep ids ascending within the bucket
+                end = starts[i + 1] if i + 1 < len(starts) else self.letter_end[c]
+                pos = starts[i] + int(np.searchsorted(self.ids[starts[i]:end], word_id))
+            else:
+                # New bucket for this length
+                pos = starts[i] if i < len(starts) else self.letter_end[c]
+                lengths.insert(i, len(word))
+                starts.insert(i, pos)
+
+            self.ids = np.insert(self.ids, pos, word_id)
+            self.lengths = np.insert(self.lengths, pos, len(word))
+            self.masks = np.insert(self.masks, pos, letter_mask(word))
+            self.max_len = max(self.max_len, len(word))
+
+            # Shift every bucket after the inserted word
+            for j in range(i + 1, len(starts)):
+                starts[j] += 1
+            self.letter_end[c] += 1
+            for c2 in ascii_lowercase[ascii_lowercase.index(c) + 1:]:
+                self.buckets[c2] = (self.buckets[c2][0], [j + 1 for j in self.buckets[c2][1]])
+                self.letter_end[c2] += 1
+        self.update_cumulative()
+
+    def get_range(self, starting_letter: str, min_len: int = 1) -> Tuple[int, int]:
+        # Range of words starting with letter and having at least min_len letters
+        lengths, starts = self.buckets[starting_letter]
+        end = self.letter_end[starting_letter]
+        i = bisect_left(lengths, min_len)
+        return (starts[i] if i < len(starts) else end), end
+
+    def get_ranges(self, min_len: int = 1, starting_letter: Optional[str] = None) -> List[Tuple[int, int]]:
+        if starting_letter:
+            return [self.get_range(starting_letter, min_len)]
+        if min_len > self.max_len:
+            return []
+        return self.cumulative[max(min_len, 1)][0]
+
+    def random_index(self, min_len: int = 1, starting_letter: Optional[str] = None) -> Optional[int]:
+        # Uniformly pick the index of a word satisfying the length and starting letter constraints
+        if starting_letter:
+            start, end = self.get_range(starting_letter, min_len)
+            return random.randrange(start, end) if start < end else None
+        if min_len > self.max_len:
+            return None
+        ranges, cumulative = self.cumulative[max(min_len, 1)]
+        if not cumulative[-1]:
+            return None
+        n = random.randrange(cumulative[-1])
+        i = bisect_right(cumulative, n)
+        start, end = ranges[i]
+        return end - (cumulative[i] - n)
+
+    def filter(
+        self,
+        min_len: int = 1,
+        starting_letter: Optional[str] = None,
+        banned_letters: Optional[List[str]] = None,
+        required_letter: Optional[str] = None,
+    ) -> np.ndarray:
+        # Indices of words satisfying every constraint, computed with one mask operation per constraint
+        if starting_letter:
+            start, end = self.get_range(starting_letter, min_len)
+            masks = self.masks[start:end]
+            keep = np.ones(len(masks), dtype=bool)
+        else:
+            start = 0
+            masks = self.masks
+            keep = self.lengths >= min_len
+        if banned_letters:
+            keep &= (masks & letter_mask(banned_letters)) == 0
+        if required_letter:
+            keep &= (masks & letter_mask(required_letter)) != 0
+        return np.flatnonzero(keep) + start
+
+
+class Dictionary:
+    # Snapshot of all words and structures derived from them
+    # Never modified after creation, words are changed by replacing the whole snapshot,
+    # so readers always see a consistent set of words
+
+    def __init__(self, store: WordStore, version: int = 1, index: Optional[WordIndex] = None) -> None:
+        self.version = version
+        self.store = store
+        self.words_all = WordList(store)  # All words
+        # Letter mapped to words starting with letter
+        # The same views serve as per-letter sets since they support membership tests
+        self.words_li = {c: WordList(store, *prefix_range(self.words_all, c)) for c in ascii_lowercase}
+        self.words_set = self.words_li
+        self.index = index or WordIndex(store)  # Word ids bucketed by first letter and length
+
+    def add_words(self, words: Iterable[str]) -> "Dictionary":
+        # Return a new snapshot with words added, updating a copy of the word index instead of rebuilding it
+        store, inserted_at = self.store.insert(words)
+        if store is self.store:
+            return self
+        index = self.index.copy()
+        index.insert_words(store, inserted_at)
+        return Dictionary(store, version=self.version + 1, index=index)
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and word[:1] in self.words_set and word in self.words_set[word[0]]
+
+    def filter_words(
+        self,
+        min_len: int = 1,
+        starting_letter: Optional[str] = None,
+        banned_letters: Optional[List[str]] = None,
+        required_letter: Optional[str] = None,
+        exclude_words: Optional["UsedWords"] = None,
+    ) -> List[str]:
+        candidates = self.index.filter(min_len, starting_letter, banned_letters, required_letter)
+        if exclude_words:
+            exclude_words.bind(self)
+            candidates = candidates[~exclude_words.mask(self.index.ids[candidates])]
+        return [self.index.word(i) for i in candidates.tolist()]
+
+    def random_word(
+        self,
+        min_len: int = 1,
+        starting_letter: Optional[str] = None,
+        banned_letters: Optional[List[str]] = None,
+        required_letter: Optional[str] = None,
+        exclude_words: Optional["UsedWords"] = None,
+    ) -> Optional[str]:
+        index = self.index
+        if exclude_words:
+            exclude_words.bind(self)
+
+        if not banned_letters and not required_letter:
+            # Words satisfying length and starting letter constraints are sampled from the index directly
+            # Rejection sampling: used words are rarely picked, so it is rarely necessary to scan every candidate
+            for _ in range(32):
+                i = index.random_index(min_len, starting_letter)
+                if i is None:  # No words satisfying length and starting letter constraints
+                    return None
+                if not exclude_words or int(index.ids[i]) not in exclude_words.ids:
+                    return index.word(i)
+
+        candidates = index.filter(min_len, starting_letter, banned_letters, required_letter)
+        if exclude_words:
+            candidates = candidates[~exclude_words.mask(index.ids[candidates])]
+        if len(candidates):
+            return index.word(candidates[random.randrange(len(candidates))])
+        else:
+            return None
+
+    def search_prefix(self, prefix: str, offset: int = 0) -> Tuple[Iterator[str], int]:
+        # Lazily iterate through words starting with prefix from offset onwards
+        # Also return the total number of words starting with prefix
+        words = self.words_all
+        start, end = prefix_range(words, prefix)
+        return (words[i] for i in range(start + offset, end)), end - start
+
+
+class UsedWords:
+    # Words used in a game, tracked as word ids of a dictionary snapshot
+    # Ids are positions in the snapshot so they are remapped whenever the dictionary is replaced
+
+    def __init__(self, get_dictionary: Callable[[], Dictionary]) -> None:
+        self.get_dictionary = get_dictionary
+        self.dictionary: Optional[Dictionary] = None
+        self.ids: Set[int] = set()
+        self.array: Optional[np.ndarray] = None  # Sorted ids for vectorized exclusion, built on demand
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def bind(self, dictionary: Dictionary) -> None:
+        if dictionary is self.dictionary:
+            return
+        if self.dictionary is not None and self.ids:
+            # Words dropped from the dictionary can no longer be picked, so they need not be tracked
+            words = [self.dictionary.store.word(i) for i in self.ids]
+            self.ids = {i for i in map(dictionary.store.find, words) if i != -1}
+            self.array = None
+        self.dictionary = dictionary
+
+    def add(self, word: str) -> None:
+        self.bind(self.get_dictionary())
+        i = self.dictionary.store.find(word)
+        if i != -1:
+            self.ids.add(i)
+            self.array = None
+
+    def __contains__(self, word: object) -> bool:
+        self.bind(self.get_dictionary())
+        return isinstance(word, str) and self.dictionary.store.find(word) in self.ids
+
+    def mask(self, ids: np.ndarray) -> np.ndarray:
+        # Boolean mask of which ids are used, ids must belong to the bound dictionary
+        if self.array is None:
+            self.array = np.array(sorted(self.ids), dtype=np.int32)
+        return np.isin(ids, self.array)